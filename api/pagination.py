@@ -0,0 +1,25 @@
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+from backend.pagination import KeysetPaginator
+
+class KeysetPagination(BasePagination):
+	page_size = 20
+	ordering = None
+	with_count = False
+	cursor_query_param = 'cursor'
+
+	def paginate_queryset(self, queryset, request, view=None):
+		paginator = KeysetPaginator(queryset, self.page_size, ordering=self.ordering, with_count=self.with_count)
+		self.page = paginator.get_page(request.query_params.get(self.cursor_query_param))
+		return list(self.page)
+
+	def get_paginated_response(self, data):
+		response = {
+			'next' : self.page.next_cursor,
+			'previous' : self.page.previous_cursor,
+			'results' : data,
+		}
+		if self.with_count:
+			response['count'] = self.page.paginator.count
+		return Response(response)
@@ -70,21 +70,42 @@ class VideoUploadSerializer(serializers.ModelSerializer):
 
 class CommentSerializer(serializers.ModelSerializer):
 	replies = serializers.SerializerMethodField()
+	replies_next = serializers.SerializerMethodField()
+	reply_count = serializers.SerializerMethodField()
 	author_name = serializers.CharField(read_only=True, source='author.name')
 	author_id = serializers.CharField(read_only=True, source='author.channel_id')
-	likes = serializers.IntegerField(source='likes.count', required=False)
-	dislikes = serializers.IntegerField(source='dislikes.count', required=False)
+	likes = serializers.SerializerMethodField()
+	dislikes = serializers.SerializerMethodField()
 	text = serializers.CharField(source='sanitized_text')
 
 	class Meta:
 		model = Comment
-		exclude = ['author', 'video']
+		exclude = ['author', 'video', 'sanitized_text']
 
+	# Comments loaded through backend.comments carry their counts and first
+	# replies, the fallbacks only run for single comments.
 	def get_replies(self, obj):
-		queryset = Comment.objects.filter(parent_id=obj.id)
-		serializer = CommentSerializer(queryset, many=True)
+		serializer = CommentSerializer(getattr(obj, 'loaded_replies', []), many=True)
 		return serializer.data
 
+	def get_replies_next(self, obj):
+		return getattr(obj, 'replies_cursor', None)
+
+	def get_reply_count(self, obj):
+		if hasattr(obj, 'reply_count'):
+			return obj.reply_count
+		return obj.replies.count()
+
+	def get_likes(self, obj):
+		if hasattr(obj, 'like_count'):
+			return obj.like_count
+		return obj.likes.count()
+
+	def get_dislikes(self, obj):
+		if hasattr(obj, 'dislike_count'):
+			return obj.dislike_count
+		return obj.dislikes.count()
+
 class ChannelSerializer(serializers.ModelSerializer):
 	videos = serializers.CharField(source='videos.count')
 	subscriptions = serializers.CharField(source='subscriptions.count')
@@ -101,25 +122,51 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 		model = Subscription
 		fields = '__all__'
 
+class CompactVideoSerializer(serializers.ModelSerializer):
+	thumbnail = serializers.CharField(source='get_thumbnail')
+
+	class Meta:
+		model = Video
+		fields = ['pk', 'watch_id', 'title', 'thumbnail']
+
+class CompactCommentSerializer(serializers.ModelSerializer):
+	text = serializers.CharField(source='sanitized_text')
+
+	class Meta:
+		model = Comment
+		fields = ['id', 'text']
+
+class CompactChannelSerializer(serializers.ModelSerializer):
+	avatar = serializers.CharField(source='get_avatar')
+
+	class Meta:
+		model = Channel
+		fields = ['channel_id', 'name', 'avatar']
+
 class GenericNotificationField(serializers.RelatedField):
 	def to_representation(self, value):
 		if isinstance(value, Video):
-			return VideoSerializer(value).data
+			return CompactVideoSerializer(value).data
 		if isinstance(value, Comment):
-			return CommentSerializer(value).data
+			return CompactCommentSerializer(value).data
 		if isinstance(value, Channel):
-			return ChannelSerializer(value).data
+			return CompactChannelSerializer(value).data
 		raise Exception('Unexpected type of object')
 
 class NotificationSerializer(serializers.ModelSerializer):
 	action_object = GenericNotificationField(read_only=True)
 	target_object = GenericNotificationField(read_only=True)
-	actor = GenericNotificationField(read_only=True)
+	actor = CompactChannelSerializer(read_only=True)
+	latest_actors = CompactChannelSerializer(source='latest_actor_list', many=True, read_only=True)
 	created = serializers.SerializerMethodField()
+	updated = serializers.SerializerMethodField()
 
 	def get_created(self, obj):
 		return timesince(obj.created)
 
+	def get_updated(self, obj):
+		return timesince(obj.updated)
+
 	class Meta:
 		model = Notification
-		fields = ['id', 'actor', 'action_object', 'target_object', 'created', 'notification_type', 'recipient', 'unread']
+		fields = ['id', 'actor', 'actor_count', 'latest_actors', 'action_object', 'target_object', 'created', 'updated', 'notification_type', 'recipient', 'unread']
@@ -16,8 +16,12 @@ urlpatterns = [
 	path('comments/like', views.CommentLikeView.as_view(), name='api_comment_like'),
 	path('comments/dislike', views.CommentDislikeView.as_view(), name='api_comment_dislike'),
 	path('comments/tickets', views.CommentTicketView.as_view(), name='api_comment_tickets'),
+	path('comments/replies/<int:comment_id>', views.CommentRepliesView.as_view(), name='api_comment_replies'),
 	path('comments/<watch_id>', views.CommentView.as_view(), name='api_comments'),
 	path('subscriptions', views.SubscriptionsView.as_view(), name='api_subscriptions'),
+	path('search/suggest', views.SearchSuggestView.as_view(), name='api_search_suggest'),
 	path('notifications', views.NotificationsView.as_view(), name='api_notifications_unread'),
+	path('notifications/bulk', views.NotificationsBulkView.as_view(), name='api_notifications_bulk'),
+	path('notifications/count', views.NotificationCountView.as_view(), name='api_notifications_count'),
 	path('admin/ban_user', views.BanUser.as_view(), name='api_ban_user'),
 ]
\ No newline at end of file
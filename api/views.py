@@ -3,6 +3,7 @@ import json
 # 
 from PIL import Image
 from io import BytesIO
+from datetime import timedelta
 
 from django.shortcuts import render
 from django.views import View
@@ -25,8 +26,9 @@ from rest_framework import status
 
 from .serializers import VideoSerializer, VideoUploadSerializer, VideoEditSerializer, CommentSerializer, SubscriptionSerializer, NotificationSerializer
 from .permissions import IsAuthenticated, ReadOnly, IsSuperUser
+from .pagination import KeysetPagination
 
-from backend.queries import get_user, toggle_like, toggle_dislike, get_video, get_videos_from_channel, get_channel, toggle_subscription, get_channel_by_id, increment_view_count, get_image_by_pk, toggle_comment_like, toggle_comment_dislike, get_comment
+from backend.queries import get_user, toggle_like, toggle_dislike, get_video, get_videos_from_channel, toggle_subscription, get_channel_by_id, increment_view_count, get_image_by_pk, toggle_comment_like, toggle_comment_dislike, get_comment, get_search_suggestions, get_comment_threads, get_comment_replies, attach_comment_replies, load_notifications
 from backend.models import Video, Comment, CommentLike, CommentTicket, VideoTicket, Subscription, Notification
 from backend.models import Image as ImageModel
 from backend.forms import VideoDetailsForm
@@ -46,7 +48,7 @@ class LikeView(View):
 			return JsonResponse({'success' : False, 'error' : 'Missing watch_id'})
 
 		video = get_video(watch_id)
-		channel = get_channel(request.user)
+		channel = request.channel
 		likes, dislikes = toggle_like(video, channel)
 
 		return JsonResponse({'success' : True, 'likes': likes, 'dislikes': dislikes})
@@ -65,7 +67,7 @@ class DislikeView(View):
 			return JsonResponse({'success' : False, 'error' : 'Missing watch_id.'})
 		
 		video = get_video(watch_id)
-		channel = get_channel(request.user)
+		channel = request.channel
 		likes, dislikes = toggle_dislike(video, channel)
 
 		return JsonResponse({'success' : True, 'likes' : likes, 'dislikes': dislikes})
@@ -77,7 +79,7 @@ class SubscribeView(View):
 	def post(self, request):
 		if not request.user.is_authenticated:
 			return JsonResponse({'success' : False, 'error' : 'Authentication required.'})
-		from_channel = get_channel(request.user)
+		from_channel = request.channel
 
 		channel_id = request.POST.get('channel_id', None)
 		if not channel_id:
@@ -112,17 +114,20 @@ class IncrementViewsView(View):
 		return JsonResponse({'success' : True, 'view_count' : view_count})
 
 class VideoViewSet(viewsets.ModelViewSet):
+		pagination_class = KeysetPagination
+
 		def list(self, request, channel_id):
 			channel = get_channel_by_id(channel_id)
 			if not channel:
 				return Response({'message': 'Channel not found.'}, status=status.HTTP_400_BAD_REQUEST)
-			queryset = Video.objects.filter(channel__exact=channel)
-			serializer = VideoSerializer(queryset, many=True)
-			return Response(serializer.data)
+			queryset = Video.objects.filter(channel__exact=channel).select_related('image_set__primary_image').prefetch_related('videostrike_set').order_by('-created')
+			page = self.paginate_queryset(queryset)
+			serializer = VideoSerializer(page, many=True)
+			return self.get_paginated_response(serializer.data)
 
 class UploadAvatarView(View):
 	def post(self, request):
-		channel = get_channel(request.user)
+		channel = request.channel
 		in_file = request.FILES.get('avatar')
 		out_file = BytesIO()
 		in_image = Image.open(in_file)
@@ -266,12 +271,12 @@ class CommentView(APIView):
 		video = get_video(watch_id)
 		if not video:
 			return Response('Video not found.', status=status.HTTP_400_BAD_REQUEST)
-		queryset = Comment.objects.filter(parent_id=None, video=video)
-		serializer = CommentSerializer(queryset, many=True)
-		return Response(serializer.data)
+		paginator = KeysetPagination()
+		page = paginator.paginate_queryset(get_comment_threads(video), request, view=self)
+		serializer = CommentSerializer(attach_comment_replies(page), many=True)
+		return paginator.get_paginated_response(serializer.data)
 
 	def post(self, request, watch_id):
-		print(request.data)
 		video = get_video(watch_id)
 		if not video:
 			return Response('Video not found.', status=status.HTTP_400_BAD_REQUEST)
@@ -291,6 +296,17 @@ class CommentView(APIView):
 		return Response(serializer.data)
 
 
+class CommentRepliesView(APIView):
+	def get(self, request, comment_id):
+		try:
+			comment = get_comment(comment_id)
+		except Comment.DoesNotExist:
+			return Response('Comment not found.', status=status.HTTP_400_BAD_REQUEST)
+		paginator = KeysetPagination()
+		page = paginator.paginate_queryset(get_comment_replies(comment), request, view=self)
+		serializer = CommentSerializer(page, many=True)
+		return paginator.get_paginated_response(serializer.data)
+
 class CommentLikeView(APIView):
 	permission_classes = [IsAuthenticated,]
 
@@ -346,44 +362,85 @@ class SubscriptionsView(APIView):
 	permission_classes = [IsAuthenticated]
 
 	def get(self, request):
-		queryset = Subscription.objects.filter(from_channel=request.channel)
-		serializer =  SubscriptionSerializer(queryset, many=True)
-		return Response(serializer.data)
+		queryset = Subscription.objects.filter(from_channel=request.channel).select_related('to_channel').order_by('-pk')
+		paginator = KeysetPagination()
+		page = paginator.paginate_queryset(queryset, request, view=self)
+		serializer =  SubscriptionSerializer(page, many=True)
+		return paginator.get_paginated_response(serializer.data)
 
 class NotificationsView(APIView):
 	permission_classes = [IsAuthenticated]
 
 	def get(self, request):
-		status = request.GET.get('status')
-		if status == 'unread':
-			queryset = request.user.notifications.unread().filter(recipient=request.user)
-		else:
-			queryset = request.user.notifications.all().filter(recipient=request.user) 
-		serializer = NotificationSerializer(queryset, many=True)
-		data = {
-			'unread_count' : queryset.count(),
-			'unread_list' : serializer.data 
-		}
-		return Response(data)
+		queryset = Notification.objects.filter(recipient=request.user)
+		if request.GET.get('status') == 'unread':
+			queryset = queryset.filter(unread=True)
+		paginator = KeysetPagination()
+		page = paginator.paginate_queryset(queryset.select_related('actor').order_by('-updated'), request, view=self)
+		serializer = NotificationSerializer(load_notifications(page), many=True)
+		response = paginator.get_paginated_response(serializer.data)
+		response.data['unread_count'] = request.user.unread_notification_count
+		return response
 
 	def post(self, request):
-		try:
-			notification = Notification.objects.get(pk=request.data.get('id'))
-		except Notification.DoesNotExist as e:
+		notifications = Notification.objects.filter(pk=request.data.get('id'), recipient=request.user)
+		if not notifications.exists():
 			return Response({}, status=status.HTTP_400_BAD_REQUEST)
-		notification.unread = False
-		notification.save()
+		Notification.objects.mark_read(notifications)
 		return Response(request.data)
 
 	def delete(self, request):
-		print(request.GET.get('id'))
-		try:
-			notification = Notification.objects.get(pk=request.GET.get('id'))
-		except Notification.DoesNotExist as e:
+		notifications = Notification.objects.filter(pk=request.GET.get('id'), recipient=request.user)
+		if not notifications.exists():
 			return Response({}, status=status.HTTP_400_BAD_REQUEST)
-		notification.delete()
+		Notification.objects.delete_notifications(notifications)
 		return Response({})
 
+class NotificationsBulkView(APIView):
+	permission_classes = [IsAuthenticated]
+
+	def filter_queryset(self, request, params):
+		queryset = Notification.objects.filter(recipient=request.user)
+		before = params.get('before')
+		if before:
+			queryset = queryset.filter(pk__lte=int(before))
+		older_than = params.get('older_than')
+		if older_than:
+			queryset = queryset.filter(updated__lt=timezone.now() - timedelta(days=int(older_than)))
+		if params.get('status') == 'unread':
+			queryset = queryset.filter(unread=True)
+		elif params.get('status') == 'read':
+			queryset = queryset.filter(unread=False)
+		return queryset
+
+	def post(self, request):
+		try:
+			queryset = self.filter_queryset(request, request.data)
+		except (ValueError, OverflowError):
+			return Response({}, status=status.HTTP_400_BAD_REQUEST)
+		return Response({'updated' : Notification.objects.mark_read(queryset)})
+
+	def delete(self, request):
+		try:
+			queryset = self.filter_queryset(request, request.GET)
+		except (ValueError, OverflowError):
+			return Response({}, status=status.HTTP_400_BAD_REQUEST)
+		deleted, _ = Notification.objects.delete_notifications(queryset)
+		return Response({'deleted' : deleted})
+
+class NotificationCountView(APIView):
+	permission_classes = [IsAuthenticated]
+
+	def get(self, request):
+		count = request.user.unread_notification_count
+		# Aggregated notifications change without changing the count.
+		updated = request.user.notifications.unread().order_by('-updated').values_list('updated', flat=True).first() if count else None
+		return Response({'unread_count' : count, 'updated' : updated})
+
+class SearchSuggestView(APIView):
+	def get(self, request):
+		return Response({'suggestions' : get_search_suggestions(request.GET.get('q', ''))})
+
 class BanUser(APIView):
 	permission_classes = [IsSuperUser]
 
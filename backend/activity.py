@@ -0,0 +1,23 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from actstream.models import Action
+
+from .models import Channel, Video
+
+FEED_ORDERING = ['-timestamp', '-pk']
+
+def _object_ids(queryset):
+    # Generic relations store object ids as text, comparing them against a
+    # cast subquery keeps the lookup on the object id index.
+    return queryset.annotate(object_id=Cast('pk', CharField(max_length=255))).values('object_id')
+
+def get_channel_activity(channel):
+    actions = Action.objects.public(actor_content_type=ContentType.objects.get_for_model(Channel), actor_object_id=str(channel.pk), verb='uploaded')
+    return actions.prefetch_related('actor', 'action_object__image_set__primary_image').order_by(*FEED_ORDERING)
+
+def get_channel_comments(channel):
+    videos = _object_ids(Video.objects.filter(channel=channel))
+    actions = Action.objects.public(target_content_type=ContentType.objects.get_for_model(Video), target_object_id__in=videos, verb='commented')
+    return actions.prefetch_related('actor', 'action_object', 'target').order_by(*FEED_ORDERING)
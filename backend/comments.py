@@ -0,0 +1,48 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, CommentLike, CommentDislike
+from .pagination import KeysetPaginator
+
+THREAD_ORDERING = ['-created', '-pk']
+REPLY_ORDERING = ['created', 'pk']
+REPLY_PREVIEW_COUNT = 3
+
+def _count(queryset, field):
+    counts = queryset.filter(**{field : OuterRef('pk')}).order_by().values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+def with_counts(queryset):
+    return queryset.select_related('author').annotate(
+        like_count=_count(CommentLike.objects.all(), 'comment'),
+        dislike_count=_count(CommentDislike.objects.all(), 'comment'),
+        reply_count=_count(Comment.objects.all(), 'parent'),
+    )
+
+def get_comment_threads(video):
+    return with_counts(Comment.objects.filter(video=video, parent=None)).order_by(*THREAD_ORDERING)
+
+def get_replies(comment):
+    return with_counts(Comment.objects.filter(parent=comment)).order_by(*REPLY_ORDERING)
+
+def attach_replies(comments, count=REPLY_PREVIEW_COUNT):
+    comments = list(comments)
+    threads = { comment.pk : comment for comment in comments }
+    for comment in comments:
+        comment.loaded_replies = []
+        comment.replies_cursor = None
+    if not threads:
+        return comments
+
+    # The first replies of every thread are fetched in a single query, the
+    # rest is paged through get_replies() from the cursor left on the thread.
+    first_replies = Comment.objects.filter(parent=OuterRef('parent')).order_by(*REPLY_ORDERING).values('pk')[:count]
+    replies = with_counts(Comment.objects.filter(parent__in=list(threads), pk__in=Subquery(first_replies)))
+    for reply in replies.order_by('parent', *REPLY_ORDERING):
+        threads[reply.parent_id].loaded_replies.append(reply)
+
+    paginator = KeysetPaginator(Comment.objects.all(), count, ordering=REPLY_ORDERING)
+    for comment in comments:
+        if comment.loaded_replies and comment.reply_count > len(comment.loaded_replies):
+            comment.replies_cursor = paginator.encode_cursor(comment.loaded_replies[-1])
+    return comments
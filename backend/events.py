@@ -0,0 +1,31 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+import django_rq
+
+# Every user has a Redis pub/sub channel, web.sse streams it to their browser.
+CHANNEL_PREFIX = 'events:user:'
+
+def user_channel(user_id):
+    return f'{CHANNEL_PREFIX}{user_id}'
+
+def _message(event, data):
+    return json.dumps({'event' : event, 'data' : data}, cls=DjangoJSONEncoder)
+
+def publish(user_id, event, **data):
+    publish_many([user_id], event, **data)
+
+def publish_many(user_ids, event, **data):
+    message = _message(event, data)
+    user_ids = set(user_ids)
+
+    def send():
+        pipe = django_rq.get_connection().pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.publish(user_channel(user_id), message)
+        pipe.execute()
+
+    # Clients refetch what changed, the rows must be visible by then.
+    transaction.on_commit(send)
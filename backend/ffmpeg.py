@@ -5,7 +5,7 @@ import tempfile
 
 from django.core.files.base import ContentFile
 
-from . import ffmpegprogress
+from . import events, ffmpegprogress
 
 def ffprobe(in_file):
 	return ffmpegprogress.ffprobe(in_file)
@@ -92,9 +92,21 @@ def on_message_handler(percent, frame_count, total_frames, elapsed):
 	sys.stdout.write('\r{:.2f}%'.format(percent))
 	sys.stdout.flush()
 
+def progress_handler(video_instance):
+	user_id = video_instance.channel.user_id
+	published = -1
+	def on_message(percent, frame_count, total_frames, elapsed):
+		nonlocal published
+		on_message_handler(percent, frame_count, total_frames, elapsed)
+		# ffmpeg reports several times per second, whole percents are enough.
+		if int(percent) > published:
+			published = int(percent)
+			events.publish(user_id, 'video.progress', watch_id=video_instance.watch_id, percent=published)
+	return on_message
+
 def start_transcoding(video_instance):
 	out_folder = os.path.join(video_instance.playlist_file.storage.local.location, str(video_instance.channel.channel_id), str(video_instance.watch_id))
-	ffmpegprogress.start(video_instance.uploaded_file.path, out_folder, ffmpeg_callback, on_message=on_message_handler)
+	ffmpegprogress.start(video_instance.uploaded_file.path, out_folder, ffmpeg_callback, on_message=progress_handler(video_instance))
 	master_playlist = '''
 #EXTM3U
 #EXT-X-VERSION:3
@@ -1,3 +1,6 @@
+import base64, secrets
+
+from django.db.models import CharField
 from django.db.models.fields.files import FileField, FieldFile, ImageField, ImageFieldFile
 
 class WrappedFieldFile(FieldFile):
@@ -17,3 +20,28 @@ class WrappedImageFieldFile(ImageFieldFile):
 class WrappedImageField(ImageField):
 
 	attr_class = WrappedImageFieldFile
+
+class PublicIdField(CharField):
+	"""
+	Random 11 character url safe id, assigned right before the row is first
+	written so that no second save is needed.
+	"""
+
+	def __init__(self, *args, **kwargs):
+		kwargs.setdefault('max_length', 11)
+		kwargs.setdefault('editable', False)
+		kwargs.setdefault('blank', True)
+		super().__init__(*args, **kwargs)
+
+	def generate(self):
+		return base64.urlsafe_b64encode(secrets.token_bytes(8)).decode('ascii').rstrip('=')
+
+	def pre_save(self, model_instance, add):
+		value = getattr(model_instance, self.attname)
+		if not value:
+			manager = type(model_instance)._base_manager
+			value = self.generate()
+			while manager.filter(**{self.attname : value}).exists():
+				value = self.generate()
+			setattr(model_instance, self.attname, value)
+		return value
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from backend.recommendations import build_related_videos
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the related videos table from the co-view matrix of the watch history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-k', type=int, default=20, help='Number of neighbours stored per video.')
+        parser.add_argument('--history-batch-size', type=int, default=10000, help='Number of watch history rows loaded at once.')
+        parser.add_argument('--column-batch-size', type=int, default=1000, help='Number of videos whose similarities are computed at once.')
+        parser.add_argument('--insert-batch-size', type=int, default=1000, help='Number of neighbours swapped per transaction.')
+
+    def handle(self, *args, **options):
+        build_related_videos(k=options['k'], history_batch_size=options['history_batch_size'], column_batch_size=options['column_batch_size'], insert_batch_size=options['insert_batch_size'])
+        self.stdout.write(self.style.SUCCESS('Related videos rebuilt.'))
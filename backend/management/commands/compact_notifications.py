@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.models import Notification
+
+
+class Command(BaseCommand):
+    help = 'Deletes read notifications older than the retention period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS, help='Age in days after which read notifications are deleted.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        deleted = Notification.objects.compact(older_than=timedelta(days=options['days']), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} notifications.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from backend.outbox import dispatch
+
+
+class Command(BaseCommand):
+    help = 'Runs the side effects queued in the outbox, including failed events that can still be retried.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of events handled per transaction.')
+
+    def handle(self, *args, **options):
+        dispatch(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Outbox dispatched.'))
@@ -0,0 +1,110 @@
+import json, re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from backend import queries
+from backend.models import Video, Channel, ChannelStats, Comment
+
+# SQLite reports "SCAN TABLE x" before 3.36 and "SCAN x" after. Scans that
+# go through an index are fine.
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+def hot_queries(video, channel, comment):
+    yield 'get_video', lambda: queries.get_video(video.watch_id)
+    yield 'get_published_video_or_none', lambda: queries.get_published_video_or_none(video.watch_id)
+    yield 'get_channel_by_id', lambda: queries.get_channel_by_id(channel.channel_id)
+    yield 'get_videos_from_channel', lambda: list(queries.get_videos_from_channel(channel)[:20])
+    yield 'get_sub_feed', lambda: list(queries.get_sub_feed(channel)[:20])
+    yield 'get_public_videos', lambda: list(queries.get_public_videos()[:20])
+    yield 'get_channel_stats', lambda: list(ChannelStats.objects.filter(channel_id=channel.pk))
+    yield 'is_video_liked', lambda: queries.is_video_liked(video, channel)
+    yield 'is_video_disliked', lambda: queries.is_video_disliked(video, channel)
+    yield 'is_subscribed', lambda: queries.is_subscribed(video.channel, channel)
+    yield 'get_subscriber_count', lambda: queries.get_subscriber_count(channel)
+    yield 'get_comment_threads', lambda: list(queries.get_comment_threads(video)[:20])
+    yield 'get_channel_activity', lambda: list(queries.get_channel_activity(channel)[:20])
+    yield 'get_channel_comment_activity', lambda: list(queries.get_channel_comment_activity(channel)[:20])
+    yield 'get_comments_mentioning', lambda: list(queries.get_comments_mentioning(channel)[:20])
+    if comment is not None:
+        yield 'is_comment_liked', lambda: queries.is_comment_liked(comment, channel)
+        yield 'is_comment_disliked', lambda: queries.is_comment_disliked(comment, channel)
+        yield 'get_comment_replies', lambda: list(queries.get_comment_replies(comment)[:20])
+
+
+class Command(BaseCommand):
+    help = 'Replays the hot queries of backend.queries with EXPLAIN and reports sequential scans of large tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=int, default=1000, help='Tables with fewer rows may be scanned.')
+
+    def capture(self, func):
+        statements = []
+
+        def wrapper(execute, sql, params, many, context):
+            statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            func()
+        return [ (sql, params) for sql, params in statements if sql.lstrip().upper().startswith('SELECT') ]
+
+    def sqlite_scans(self, cursor, sql, params):
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        for row in cursor.fetchall():
+            match = SQLITE_SCAN.match(row[-1])
+            if match:
+                yield match.group(1)
+
+    def postgresql_scans(self, cursor, sql, params):
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node['Node Type'] == 'Seq Scan':
+                yield node['Relation Name']
+            nodes.extend(node.get('Plans', []))
+
+    def table_rows(self, cursor, table):
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [table])
+        else:
+            cursor.execute('SELECT COUNT(*) FROM %s' % connection.ops.quote_name(table))
+        row = cursor.fetchone()
+        return int(row[0]) if row else 0
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'index_audit does not support {connection.vendor}.')
+        video = Video.objects.select_related('channel').order_by('pk').first()
+        channel = Channel.objects.order_by('pk').first()
+        if video is None or channel is None:
+            raise CommandError('index_audit needs at least one channel and one video to replay queries with.')
+        comment = Comment.objects.order_by('pk').first()
+
+        explain = self.sqlite_scans if connection.vendor == 'sqlite' else self.postgresql_scans
+        flagged = 0
+        # Results cached by cacheops would hide the queries.
+        with override_settings(CACHEOPS_ENABLED=False), connection.cursor() as cursor:
+            for name, func in hot_queries(video, channel, comment):
+                problems = set()
+                for sql, params in self.capture(func):
+                    for table in explain(cursor, sql, params):
+                        rows = self.table_rows(cursor, table)
+                        if rows >= options['threshold']:
+                            problems.add(f'sequential scan on {table} (~{rows} rows)')
+                if problems:
+                    flagged += 1
+                    for problem in sorted(problems):
+                        self.stdout.write(self.style.WARNING(f'{name}: {problem}'))
+                elif options['verbosity'] > 1:
+                    self.stdout.write(f'{name}: ok')
+
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'{flagged} queries scan large tables.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No sequential scans above the threshold.'))
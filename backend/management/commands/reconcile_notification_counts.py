@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from backend.models import Notification
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the unread notification counter of every user.'
+
+    def handle(self, *args, **options):
+        Notification.objects.reconcile_unread_counts()
+        self.stdout.write(self.style.SUCCESS('Unread notification counts reconciled.'))
@@ -0,0 +1,18 @@
+import re
+
+import bleach
+
+from django.utils.html import urlize
+
+# Mentions are written as @(channel name)[channel_id] by the comment forms.
+MENTION_PATTERN = re.compile(r'@\(([^)\n]+)\)\[([\w-]+)\]')
+
+def sanitize(text):
+    return bleach.clean(text, tags=[])
+
+def render(sanitized_text):
+    html = urlize(sanitized_text, nofollow=True, autoescape=False)
+    return MENTION_PATTERN.sub(r'<a href="/channel/\2">@\1</a>', html)
+
+def find_channel_ids(text):
+    return { match.group(2) for match in MENTION_PATTERN.finditer(text) }
@@ -0,0 +1,27 @@
+# Generated by Django 3.0.14 on 2026-10-18 22:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0020_change_managers_on_video'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedVideo',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbour_of', to='backend.Video')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='backend.Video')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='relatedvideo',
+            index=models.Index(fields=['video', '-score'], name='backend_rel_video_i_66eac7_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.14 on 2026-10-18 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0021_related_videos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['channel', '-created'], name='backend_vid_channel_8fb6bf_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.0.14 on 2026-10-18 22:45
+
+from django.db import migrations, models
+
+
+def remove_duplicate_entries(apps, schema_editor):
+    WatchHistory = apps.get_model('backend', 'WatchHistory')
+    duplicates = WatchHistory.objects.values('channel', 'video').annotate(count=models.Count('id')).filter(count__gt=1)
+    for duplicate in duplicates.iterator():
+        entries = WatchHistory.objects.filter(channel=duplicate['channel'], video=duplicate['video']).order_by('-created', '-id')
+        WatchHistory.objects.filter(pk__in=list(entries.values_list('pk', flat=True)[1:])).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0022_video_channel_created_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_entries, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='watchhistory',
+            index=models.Index(fields=['channel', '-created'], name='backend_wat_channel_346246_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='watchhistory',
+            constraint=models.UniqueConstraint(fields=('channel', 'video'), name='unique_watch_history_entry'),
+        ),
+    ]
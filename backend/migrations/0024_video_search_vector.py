@@ -0,0 +1,97 @@
+# Generated by Django 3.0.14 on 2026-10-18 22:47
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector(coalesce({video}.title, '')), 'A') ||
+    setweight(to_tsvector(coalesce((SELECT name FROM backend_channel WHERE id = {video}.channel_id), '')), 'B') ||
+    setweight(to_tsvector(coalesce({video}.description, '')), 'C')
+"""
+
+CREATE_SQL = [
+    "CREATE INDEX backend_video_search_vector_idx ON backend_video USING gin (search_vector)",
+    "CREATE INDEX backend_video_title_trgm_idx ON backend_video USING gin (title gin_trgm_ops)",
+    "CREATE INDEX backend_channel_name_trgm_idx ON backend_channel USING gin (name gin_trgm_ops)",
+    """
+    CREATE FUNCTION backend_video_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := %s;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """ % SEARCH_VECTOR_SQL.format(video='NEW'),
+    """
+    CREATE TRIGGER backend_video_search_vector_insert BEFORE INSERT ON backend_video
+    FOR EACH ROW EXECUTE PROCEDURE backend_video_search_vector_update()
+    """,
+    # Django writes every column on save, so a stale search_vector coming
+    # from the instance is recomputed as well.
+    """
+    CREATE TRIGGER backend_video_search_vector_update BEFORE UPDATE ON backend_video
+    FOR EACH ROW WHEN (
+        OLD.title IS DISTINCT FROM NEW.title OR
+        OLD.description IS DISTINCT FROM NEW.description OR
+        OLD.channel_id IS DISTINCT FROM NEW.channel_id OR
+        OLD.search_vector IS DISTINCT FROM NEW.search_vector
+    ) EXECUTE PROCEDURE backend_video_search_vector_update()
+    """,
+    # Resetting the vector fires the video trigger above, which picks up the
+    # new channel name.
+    """
+    CREATE FUNCTION backend_channel_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE backend_video SET search_vector = NULL WHERE channel_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER backend_channel_search_vector_update AFTER UPDATE ON backend_channel
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE PROCEDURE backend_channel_search_vector_update()
+    """,
+    "UPDATE backend_video SET search_vector = %s" % SEARCH_VECTOR_SQL.format(video='backend_video'),
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS backend_channel_search_vector_update ON backend_channel",
+    "DROP FUNCTION IF EXISTS backend_channel_search_vector_update()",
+    "DROP TRIGGER IF EXISTS backend_video_search_vector_update ON backend_video",
+    "DROP TRIGGER IF EXISTS backend_video_search_vector_insert ON backend_video",
+    "DROP FUNCTION IF EXISTS backend_video_search_vector_update()",
+    "DROP INDEX IF EXISTS backend_channel_name_trgm_idx",
+    "DROP INDEX IF EXISTS backend_video_title_trgm_idx",
+    "DROP INDEX IF EXISTS backend_video_search_vector_idx",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0023_watch_history_unique_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
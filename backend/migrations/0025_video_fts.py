@@ -0,0 +1,53 @@
+import sqlite3
+
+from django.db import migrations
+
+
+TOKENIZER = 'trigram' if sqlite3.sqlite_version_info >= (3, 34, 0) else 'unicode61'
+
+# The content view and the sync triggers reference the video and channel
+# tables, SQLite refuses to let Django remake either of them while they
+# exist. Both are installed by backend.search.install_sqlite_triggers after
+# every migrate, which also fills the index.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE backend_video_fts USING fts5(
+        title, channel_name, description,
+        content='backend_video_search', content_rowid='id', tokenize='%s'
+    )
+    """ % TOKENIZER,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS backend_channel_fts_update",
+    "DROP TRIGGER IF EXISTS backend_video_fts_update",
+    "DROP TRIGGER IF EXISTS backend_video_fts_delete",
+    "DROP TRIGGER IF EXISTS backend_video_fts_insert",
+    "DROP TABLE IF EXISTS backend_video_fts",
+    "DROP VIEW IF EXISTS backend_video_search",
+]
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0024_video_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
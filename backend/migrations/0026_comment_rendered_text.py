@@ -0,0 +1,61 @@
+# Generated by Django 3.0.14 on 2026-10-18 22:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from backend import mentions
+
+
+def render_comments(apps, schema_editor):
+    Comment = apps.get_model('backend', 'Comment')
+    Channel = apps.get_model('backend', 'Channel')
+    CommentMention = apps.get_model('backend', 'CommentMention')
+    batch = []
+    for comment in Comment.objects.order_by('pk').iterator(chunk_size=1000):
+        comment.sanitized_text = mentions.sanitize(comment.text)
+        comment.rendered_text = mentions.render(comment.sanitized_text)
+        batch.append(comment)
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['sanitized_text', 'rendered_text'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['sanitized_text', 'rendered_text'])
+
+    channel_ids = {}
+    for comment in Comment.objects.filter(text__contains='@(').order_by('pk').iterator(chunk_size=1000):
+        for channel_id in mentions.find_channel_ids(comment.text):
+            channel_ids.setdefault(channel_id, []).append(comment.pk)
+    channels = Channel.objects.filter(channel_id__in=list(channel_ids)).values_list('pk', 'channel_id')
+    CommentMention.objects.bulk_create([ CommentMention(comment_id=comment_id, channel_id=pk) for pk, channel_id in channels for comment_id in channel_ids[channel_id] ], batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0025_video_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='rendered_text',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='sanitized_text',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.CreateModel(
+            name='CommentMention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='backend.Channel')),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='backend.Comment')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='commentmention',
+            constraint=models.UniqueConstraint(fields=('channel', 'comment'), name='unique_comment_mention'),
+        ),
+        migrations.RunPython(render_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.14 on 2026-10-18 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0026_comment_rendered_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['action_type', 'action_id'], name='backend_not_action__af54c0_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.0.14 on 2026-10-18 22:58
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_unread_notifications(apps, schema_editor):
+    User = apps.get_model('backend', 'User')
+    Notification = apps.get_model('backend', 'Notification')
+    unread = Notification.objects.filter(recipient=models.OuterRef('pk'), unread=True).order_by().values('recipient').annotate(count=models.Count('pk')).values('count')
+    User.objects.update(unread_notification_count=Coalesce(models.Subquery(unread, output_field=models.IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0028_outbox_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notification_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_unread_notifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.0.14 on 2026-10-18 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0029_user_unread_notification_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created'], name='backend_not_recipie_2da300_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(unread=False), fields=['created'], name='notification_read_created_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 3.0.14 on 2026-10-18 23:01
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def copy_created(apps, schema_editor):
+    Notification = apps.get_model('backend', 'Notification')
+    Notification.objects.update(updated=models.F('created'))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0030_notification_retention_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ('-updated',)},
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='backend_not_recipie_2da300_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notification_read_created_idx',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='actor_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='latest_actors',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='updated',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_created, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-updated'], name='backend_not_recipie_205287_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(unread=True), fields=['recipient', 'notification_type', 'target_type', 'target_id'], name='notification_aggregate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(unread=False), fields=['updated'], name='notification_read_updated_idx'),
+        ),
+    ]
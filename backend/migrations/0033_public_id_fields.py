@@ -0,0 +1,24 @@
+# Generated by Django 3.0.14 on 2026-10-18 23:08
+
+import backend.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0031_notification_aggregation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='channel',
+            name='channel_id',
+            field=backend.fields.PublicIdField(blank=True, editable=False, max_length=11),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='watch_id',
+            field=backend.fields.PublicIdField(blank=True, editable=False, max_length=11, null=True),
+        ),
+    ]
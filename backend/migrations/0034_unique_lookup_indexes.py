@@ -0,0 +1,78 @@
+# Generated by Django 3.0.14 on 2026-10-18 23:09
+
+import backend.fields
+from django.db import migrations, models
+
+
+PAIRS = [
+    ('Likes', 'channel', 'video'),
+    ('Dislikes', 'channel', 'video'),
+    ('Subscription', 'from_channel', 'to_channel'),
+    ('CommentLike', 'channel', 'comment'),
+    ('CommentDislike', 'channel', 'comment'),
+]
+
+def deduplicate(apps, schema_editor):
+    for model_name, first, second in PAIRS:
+        model = apps.get_model('backend', model_name)
+        duplicates = model._base_manager.values(first, second).annotate(keep=models.Min('pk'), count=models.Count('pk')).filter(count__gt=1)
+        for row in duplicates:
+            model._base_manager.filter(**{first : row[first], second : row[second]}).exclude(pk=row['keep']).delete()
+
+    # Ids that are missing or shared get a new one, the oldest row keeps its
+    # id so that existing links keep working.
+    for model_name, field_name in (('Channel', 'channel_id'), ('Video', 'watch_id')):
+        model = apps.get_model('backend', model_name)
+        field = model._meta.get_field(field_name)
+        seen = set()
+        for instance in model._base_manager.order_by('pk').only('pk', field_name).iterator():
+            value = getattr(instance, field_name)
+            if value and value not in seen:
+                seen.add(value)
+                continue
+            value = field.generate()
+            while value in seen or model._base_manager.filter(**{field_name : value}).exists():
+                value = field.generate()
+            seen.add(value)
+            model._base_manager.filter(pk=instance.pk).update(**{field_name : value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0033_public_id_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='channel',
+            name='channel_id',
+            field=backend.fields.PublicIdField(blank=True, editable=False, max_length=11, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='watch_id',
+            field=backend.fields.PublicIdField(blank=True, editable=False, max_length=11, null=True, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='commentdislike',
+            constraint=models.UniqueConstraint(fields=('channel', 'comment'), name='unique_comment_dislike'),
+        ),
+        migrations.AddConstraint(
+            model_name='commentlike',
+            constraint=models.UniqueConstraint(fields=('channel', 'comment'), name='unique_comment_like'),
+        ),
+        migrations.AddConstraint(
+            model_name='dislikes',
+            constraint=models.UniqueConstraint(fields=('channel', 'video'), name='unique_video_dislike'),
+        ),
+        migrations.AddConstraint(
+            model_name='likes',
+            constraint=models.UniqueConstraint(fields=('channel', 'video'), name='unique_video_like'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('from_channel', 'to_channel'), name='unique_subscription'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.0.14 on 2026-10-18 23:12
+
+from django.db import migrations, models
+
+
+def fill_is_listed(apps, schema_editor):
+    Video = apps.get_model('backend', 'Video')
+    listed = Video._base_manager.filter(transcode_status='finished', published=True, visibility='PUBLIC', channel__user__banned=False, videostrike__isnull=True)
+    Video._base_manager.filter(pk__in=listed.values('pk')).update(is_listed=True)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0034_unique_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='is_listed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(fill_is_listed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(condition=models.Q(is_listed=True), fields=['-created'], name='video_listed_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(condition=models.Q(is_listed=True), fields=['channel', '-created'], name='video_listed_channel_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(condition=models.Q(is_listed=True), fields=['category', '-created'], name='video_listed_category_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.0.14 on 2026-10-18 23:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0035_video_is_listed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelStats',
+            fields=[
+                ('channel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='backend.Channel')),
+                ('total_views', models.BigIntegerField(default=0)),
+                ('subscriber_count', models.PositiveIntegerField(default=0)),
+                ('video_count', models.PositiveIntegerField(default=0)),
+                ('updated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('featured_video', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='backend.Video')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+# actstream only indexes the generic relation columns one by one, channel
+# feeds filter on the content type and object id and page by timestamp.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('actstream', '0003_add_follow_flag'),
+        ('backend', '0036_channel_stats'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX action_actor_feed_idx ON actstream_action (actor_content_type_id, actor_object_id, timestamp)',
+            'DROP INDEX action_actor_feed_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX action_target_feed_idx ON actstream_action (target_content_type_id, target_object_id, timestamp)',
+            'DROP INDEX action_target_feed_idx',
+        ),
+    ]
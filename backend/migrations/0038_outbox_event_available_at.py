@@ -0,0 +1,19 @@
+# Generated by Django 3.0.14 on 2026-10-18 23:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0037_action_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='available_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,5 +1,8 @@
 import os, string, random, magic, base64, fixedint, json, shutil
 
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
 from django.core.exceptions import FieldError
 from django.core.files.storage import FileSystemStorage
 from django.core.files.base import File
@@ -7,15 +10,20 @@ from django.core.mail import send_mail
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 from django.utils import timezone
+from django.utils.timezone import utc
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.postgres.search import SearchQuery, SearchVector, SearchRank, TrigramSimilarity
-from django.db import models
+from django.contrib.postgres.search import SearchQuery, SearchVector, SearchVectorField, SearchRank, TrigramSimilarity
+from django.db import models, connections, transaction
+from django.db.models.functions import Coalesce, Greatest
 
 import django_rq
 from django_rq.jobs import Job
 
+from cacheops import invalidate_model
+from cacheops.invalidation import invalidate_dict
+
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill
 
@@ -24,8 +32,8 @@ import bleach
 from colorfield.fields import ColorField
 
 from .storage import WrappedBCDNStorage
-from .fields import WrappedFileField, WrappedImageField
-from . import tasks, utils
+from .fields import WrappedFileField, WrappedImageField, PublicIdField
+from . import events, mentions, tasks, utils
 
 class PublishedVideoManager(models.Manager):
     use_for_related_fields = True
@@ -33,13 +41,32 @@ class PublishedVideoManager(models.Manager):
     def get_queryset(self):
         return super().get_queryset().filter(transcode_status=Video.TranscodeStatus.DONE, published=True, channel__user__banned=False, videostrike__isnull=True)
 
+class ListedVideoManager(models.Manager):
+    """
+    Public videos that show up in listings, feeds and search. The is_listed
+    column saves the joins of PublishedVideoManager, update_listing() has to
+    run whenever one of its inputs changes.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_listed=True)
+
+    def update_listing(self, **filters):
+        videos = self.model._base_manager.filter(**filters)
+        listed = self.model.published_objects.filter(visibility=Video.VisibilityStatus.PUBLIC).values('pk')
+        # invalidated_update() so that cached listings drop or pick up the rows.
+        added = videos.filter(is_listed=False, pk__in=listed).invalidated_update(is_listed=True)
+        removed = videos.filter(is_listed=True).exclude(pk__in=listed).invalidated_update(is_listed=False)
+        return added + removed
+
     def search(self, query):
-        qs = self.get_queryset()
         sq = SearchQuery(query)
-        sv = SearchVector('title', 'description', 'channel__name')
-        sr = SearchRank(sv, sq)
-        similarity = TrigramSimilarity('title', query) + TrigramSimilarity('description', query) + TrigramSimilarity('channel__name', query)
-        return qs.annotate(rank=sr, similarity=similarity).annotate(score=(models.F('rank') + models.F('similarity')) / 2).filter(score__gt=0.1, visibility=Video.VisibilityStatus.PUBLIC).order_by('-score')
+        channels = Channel.objects.filter(name__trigram_similar=query).values('pk')
+        # Only rows matched through the GIN indexes are ranked.
+        candidates = self.get_queryset().filter(models.Q(search_vector=sq) | models.Q(title__trigram_similar=query) | models.Q(channel__in=channels))
+        sr = SearchRank(models.F('search_vector'), sq)
+        similarity = Greatest(TrigramSimilarity('title', query), TrigramSimilarity('channel__name', query))
+        return candidates.annotate(rank=sr, similarity=similarity).annotate(score=(models.F('rank') + models.F('similarity')) / 2).order_by('-score')
 
 def get_video_location(instance, filename=None):
     if instance.pk is None:
@@ -80,6 +107,14 @@ def get_video_base_location():
 def get_video_media_url():
     return os.path.join(settings.MEDIA_URL, 'videos')
 
+def delete_local_video_files(folder):
+    folder = os.path.join(get_video_base_location(), folder)
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+
+def delete_remote_video_files(folder):
+    Video._meta.get_field('playlist_file').storage.remote.delete(folder)
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None):
@@ -121,6 +156,7 @@ class User(PermissionsMixin, AbstractBaseUser):
     last_login = models.DateTimeField(default=timezone.now)
     notes = models.TextField(default='', blank=True)
     ipadress = models.GenericIPAddressField(null=True, blank=True)
+    unread_notification_count = models.PositiveIntegerField(default=0, editable=False)
 
     objects = UserManager()
 
@@ -143,10 +179,25 @@ class User(PermissionsMixin, AbstractBaseUser):
         self.ipadress = ipadress
         self.save()
 
+class ChannelManager(models.Manager):
+    SELECTED_CACHE_KEY = 'selected_channel:{}'
+
+    def get_selected(self, user):
+        key = self.SELECTED_CACHE_KEY.format(user.pk)
+        channel = cache.get(key)
+        if channel is None:
+            channel = self.filter(user=user).order_by('pk').first()
+            if channel is not None:
+                cache.set(key, channel, settings.SELECTED_CHANNEL_CACHE_TIMEOUT)
+        return channel
+
+    def forget_selected(self, user_id):
+        cache.delete(self.SELECTED_CACHE_KEY.format(user_id))
+
 class Channel(models.Model):
     name = models.CharField(max_length=20)
     description = models.TextField(max_length=5000, default="")
-    channel_id = models.CharField(max_length=11, editable=False, blank=True)
+    channel_id = PublicIdField(unique=True)
     created = models.DateTimeField(default=timezone.now)
     last_login = models.DateTimeField(default=timezone.now)
     avatar = models.ImageField(blank=True, null=True)
@@ -154,6 +205,8 @@ class Channel(models.Model):
 
     user = models.ForeignKey(User, related_name='channels', on_delete=models.CASCADE)
 
+    objects = ChannelManager()
+
     def __str__(self):
         return self.name
 
@@ -245,7 +298,7 @@ class Video(models.Model):
 
     title = models.CharField(max_length=100, default='UNTITLED VIDEO')
     description = models.TextField(blank=True, null=True)
-    watch_id = models.CharField(max_length=11, blank=True, null=True)
+    watch_id = PublicIdField(null=True, unique=True)
     created = models.DateTimeField(default=timezone.now)
 
     uploaded_file = WrappedFileField(max_length=255, storage=WrappedBCDNStorage(local_options={'location' : get_video_base_location, 'base_url' : get_video_media_url}), upload_to=get_video_location, blank=True)
@@ -264,15 +317,33 @@ class Video(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=False)
 
     published_objects = PublishedVideoManager()
+    listed_objects = ListedVideoManager()
     objects = models.Manager()
 
     subs_notified = models.BooleanField(default=False)
+    is_listed = models.BooleanField(default=False, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
     action_relations = GenericRelation('Notification', object_id_field='action_id', content_type_field='action_type')
     target_relations = GenericRelation('Notification', object_id_field='target_id', content_type_field='target_type')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['channel', '-created']),
+            models.Index(fields=['-created'], name='video_listed_created_idx', condition=models.Q(is_listed=True)),
+            models.Index(fields=['channel', '-created'], name='video_listed_channel_idx', condition=models.Q(is_listed=True)),
+            models.Index(fields=['category', '-created'], name='video_listed_category_idx', condition=models.Q(is_listed=True)),
+        ]
+
+    THUMBNAIL_CACHE_KEY = 'thumbnail_url:{}'
+
     def __str__(self):
         return str('{}/{}'.format(self.channel.channel_id, self.watch_id))
 
+    def save(self, *args, **kwargs):
+        # Outbox events written by the post_save handlers commit with the row.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def transcode(self):
         django_rq.enqueue(tasks.video_transcode_task, video=self)
 
@@ -296,10 +367,18 @@ class Video(models.Model):
             return ''
 
     def get_thumbnail(self):
-        if self.image_set and self.image_set.primary_image and self.image_set.primary_image.image.storage.exists(self.image_set.primary_image.image.name):
-            return self.image_set.primary_image.thumbnail.url
-        else:
-            return '/static/web/img/thumbnail_default.jpg'
+        image = self.image_set.primary_image if self.image_set else None
+        if image:
+            # exists() is a remote call with BunnyCDN, the resolved url of
+            # an image is kept in the cache instead of checked per listing.
+            key = self.THUMBNAIL_CACHE_KEY.format(image.pk)
+            url = cache.get(key)
+            if url is None and image.image.storage.exists(image.image.name):
+                url = image.thumbnail.url
+                cache.set(key, url, settings.THUMBNAIL_CACHE_TIMEOUT)
+            if url is not None:
+                return url
+        return '/static/web/img/thumbnail_default.jpg'
 
     def transfer_files(self):
         folder = os.path.join(get_video_base_location(), get_video_location(self))
@@ -309,13 +388,10 @@ class Video(models.Model):
         self.delete_local_files()
 
     def delete_local_files(self):
-        folder = os.path.join(get_video_base_location(), get_video_location(self))
-        if os.path.exists(folder):
-            shutil.rmtree(folder)
+        delete_local_video_files(get_video_location(self))
 
     def delete_remote_files(self):
-        folder = get_video_location(self)
-        self.playlist_file.storage.remote.delete(folder)
+        delete_remote_video_files(get_video_location(self))
 
     def get_all_playlists(self):
         storage = self.playlist_file.storage.get_storage(self.playlist_file.name)
@@ -328,38 +404,169 @@ class Likes(models.Model):
     channel = models.ForeignKey(Channel, on_delete=models.CASCADE)
     video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='likes')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['channel', 'video'], name='unique_video_like'),
+        ]
+
 class Dislikes(models.Model):
     channel = models.ForeignKey(Channel, on_delete=models.CASCADE)
     video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='dislikes')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['channel', 'video'], name='unique_video_dislike'),
+        ]
+
 class Subscription(models.Model):
     from_channel = models.ForeignKey(Channel, on_delete=models.CASCADE, related_name='subscribers')
     to_channel = models.ForeignKey(Channel, on_delete=models.CASCADE, related_name='subscriptions')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['from_channel', 'to_channel'], name='unique_subscription'),
+        ]
+
+class ChannelStatsManager(models.Manager):
+    CACHE_KEY = 'channel_stats:{}'
+    DIRTY_KEY = 'channel_stats_dirty'
+    FLUSH_LOCK_KEY = 'channel_stats_flush'
+
+    def get_for_channel(self, channel):
+        key = self.CACHE_KEY.format(channel.pk)
+        stats = cache.get(key)
+        if stats is None:
+            stats = self.filter(channel=channel).first()
+            if stats is None:
+                stats = self.refresh([channel.pk])[0]
+            cache.set(key, stats, settings.CHANNEL_STATS_CACHE_TIMEOUT)
+        return stats
+
+    def mark_dirty(self, channel_ids):
+        channel_ids = list(channel_ids)
+        if not channel_ids:
+            return
+        redis = django_rq.get_connection()
+        redis.sadd(self.DIRTY_KEY, *channel_ids)
+        # The refresh has to see the change that marked the channels.
+        transaction.on_commit(self.schedule_refresh)
+
+    def schedule_refresh(self):
+        redis = django_rq.get_connection()
+        if redis.set(self.FLUSH_LOCK_KEY, 1, nx=True, ex=300):
+            django_rq.enqueue(tasks.refresh_channel_stats_task)
+
+    def refresh_dirty(self, batch_size=100):
+        redis = django_rq.get_connection()
+        try:
+            while True:
+                channel_ids = redis.spop(self.DIRTY_KEY, batch_size)
+                if not channel_ids:
+                    break
+                self.refresh({ int(channel_id) for channel_id in channel_ids })
+        finally:
+            redis.delete(self.FLUSH_LOCK_KEY)
+
+        # Channels marked after the last pop did not schedule a refresh of
+        # their own.
+        if redis.scard(self.DIRTY_KEY):
+            self.schedule_refresh()
+
+    def refresh(self, channel_ids):
+        channels = Channel.objects.filter(pk__in=channel_ids)
+        listed = Video.listed_objects.filter(channel__in=channels)
+        total_views = dict(Video.objects.filter(channel__in=channels).values('channel').annotate(total=models.Sum('views')).values_list('channel', 'total'))
+        subscriber_counts = dict(Subscription.objects.filter(to_channel__in=channels).values('to_channel').annotate(count=models.Count('pk')).values_list('to_channel', 'count'))
+        video_counts = dict(listed.values('channel').annotate(count=models.Count('pk')).values_list('channel', 'count'))
+        featured = Video.listed_objects.filter(channel=models.OuterRef('pk')).order_by('-views', '-pk').values('pk')[:1]
+        featured_ids = dict(channels.annotate(featured=models.Subquery(featured)).values_list('pk', 'featured'))
+
+        stats = []
+        for channel_id, featured_id in featured_ids.items():
+            values = {
+                'total_views' : total_views.get(channel_id) or 0,
+                'subscriber_count' : subscriber_counts.get(channel_id, 0),
+                'video_count' : video_counts.get(channel_id, 0),
+                'featured_video_id' : featured_id,
+                'updated' : timezone.now(),
+            }
+            stats.append(self.update_or_create(channel_id=channel_id, defaults=values)[0])
+        cache.set_many({ self.CACHE_KEY.format(item.channel_id) : item for item in stats }, settings.CHANNEL_STATS_CACHE_TIMEOUT)
+        return stats
+
+class ChannelStats(models.Model):
+    """
+    Counters shown in the channel page header, recomputed in the background
+    whenever one of them may have changed.
+    """
+    channel = models.OneToOneField(Channel, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_views = models.BigIntegerField(default=0)
+    subscriber_count = models.PositiveIntegerField(default=0)
+    video_count = models.PositiveIntegerField(default=0)
+    featured_video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    updated = models.DateTimeField(default=timezone.now)
+
+    objects = ChannelStatsManager()
+
 class Comment(models.Model):
     author = models.ForeignKey(Channel, on_delete=models.CASCADE, related_name='comments')
     video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='comments')
     parent = models.ForeignKey('Comment', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
     text = models.TextField(max_length=500)
+    sanitized_text = models.TextField(default='', editable=False)
+    rendered_text = models.TextField(default='', editable=False)
     created = models.DateTimeField(default=timezone.now)
 
     action_relations = GenericRelation('Notification', object_id_field='action_id', content_type_field='action_type')
     target_relations = GenericRelation('Notification', object_id_field='target_id', content_type_field='target_type')
 
-    def sanitized_text(self):
-        return bleach.clean(self.text, tags=[])
-
     def __str__(self):
         return f'Comment from {self.author.name} on {self.video.title}'
 
+    def save(self, *args, **kwargs):
+        self.sanitized_text = mentions.sanitize(self.text)
+        self.rendered_text = mentions.render(self.sanitized_text)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def sync_mentions(self, created=False):
+        channel_ids = mentions.find_channel_ids(self.text)
+        channels = list(Channel.objects.filter(channel_id__in=channel_ids)) if channel_ids else []
+        existing = set()
+        if not created:
+            self.mentions.exclude(channel__in=channels).delete()
+            existing = set(self.mentions.values_list('channel_id', flat=True))
+        added = [ channel for channel in channels if channel.pk not in existing ]
+        CommentMention.objects.bulk_create([ CommentMention(comment=self, channel=channel) for channel in added ], ignore_conflicts=True)
+        return added
+
+class CommentMention(models.Model):
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='mentions')
+    channel = models.ForeignKey(Channel, on_delete=models.CASCADE, related_name='mentions')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['channel', 'comment'], name='unique_comment_mention'),
+        ]
+
 class CommentLike(models.Model):
     channel = models.ForeignKey(Channel, on_delete=models.CASCADE)
     comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='likes')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['channel', 'comment'], name='unique_comment_like'),
+        ]
+
 class CommentDislike(models.Model):
     channel = models.ForeignKey(Channel, on_delete=models.CASCADE)
     comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='dislikes')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['channel', 'comment'], name='unique_comment_dislike'),
+        ]
+
 class TicketManager(models.Manager):
     def is_open(self):
         return super().get_queryset().filter(status=Ticket.Status.OPEN)
@@ -404,22 +611,131 @@ class VideoTicket(Ticket):
 
 class NotificationManager(models.Manager):
     def unread(self):
-        return super().get_queryset().filter(unread=True)
+        # get_queryset() keeps the recipient filter of related managers.
+        return self.get_queryset().filter(unread=True)
+
+    # The unread counters on User are adjusted by these helpers. Cascading
+    # deletes bypass them and are corrected by reconcile_unread_counts().
+    # Users are read through cacheops, the counters are changed with
+    # invalidated_update() so that cached users see the new value.
+    def create(self, **kwargs):
+        with transaction.atomic():
+            notification = super().create(**kwargs)
+            if notification.unread:
+                User.objects.filter(pk=notification.recipient_id).invalidated_update(unread_notification_count=models.F('unread_notification_count') + 1)
+            events.publish(notification.recipient_id, 'notifications')
+        return notification
+
+    def notify(self, recipient_id, notification_type, actor, action_object, target_object):
+        if notification_type not in Notification.AGGREGATED_TYPES:
+            return self.create(recipient_id=recipient_id, notification_type=notification_type, actor=actor, action_object=action_object, target_object=target_object)
+
+        now = timezone.now()
+        target_type = ContentType.objects.get_for_model(target_object)
+        with transaction.atomic():
+            # Bursts on the same target are folded into the unread
+            # notification that opened the window instead of adding rows.
+            notification = self.select_for_update().filter(
+                recipient=recipient_id, notification_type=notification_type, target_type=target_type, target_id=target_object.pk,
+                unread=True, created__gte=now - timedelta(seconds=settings.NOTIFICATION_AGGREGATION_WINDOW),
+            ).order_by('-created').first()
+            if notification is None:
+                return self.create(recipient_id=recipient_id, notification_type=notification_type, actor=actor, action_object=action_object, target_object=target_object, latest_actors=str(actor.pk))
+            notification.add_actor(actor)
+            notification.action_object = action_object
+            notification.updated = now
+            notification.save(update_fields=['actor', 'actor_count', 'latest_actors', 'action_type', 'action_id', 'updated'])
+            events.publish(recipient_id, 'notifications')
+        return notification
+
+    def _bulk_create_unread(self, notifications):
+        with transaction.atomic():
+            self.bulk_create(notifications)
+            User.objects.filter(pk__in=[ n.recipient_id for n in notifications ]).invalidated_update(unread_notification_count=models.F('unread_notification_count') + 1)
+            events.publish_many([ n.recipient_id for n in notifications ], 'notifications')
+
+    def _decrement_unread_counts(self, queryset):
+        counts = queryset.filter(unread=True).order_by().values('recipient').annotate(count=models.Count('pk'))
+        for row in counts:
+            User.objects.filter(pk=row['recipient']).invalidated_update(unread_notification_count=Greatest(models.F('unread_notification_count') - row['count'], 0))
+            events.publish(row['recipient'], 'notifications')
+
+    def mark_read(self, queryset):
+        with transaction.atomic():
+            self._decrement_unread_counts(queryset)
+            return queryset.filter(unread=True).invalidated_update(unread=False)
+
+    def delete_notifications(self, queryset):
+        with transaction.atomic():
+            self._decrement_unread_counts(queryset)
+            return queryset.delete()
+
+    def compact(self, older_than=None, batch_size=1000):
+        older_than = older_than or timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+        # Only read notifications are pruned, unread ones are kept regardless
+        # of their age. Small batches keep the row locks short.
+        expired = self.filter(unread=False, updated__lt=timezone.now() - older_than).order_by()
+        deleted = 0
+        while True:
+            batch = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return deleted
+            deleted += self.filter(pk__in=batch).delete()[0]
+
+    def reconcile_unread_counts(self):
+        unread = self.filter(recipient=models.OuterRef('pk'), unread=True).order_by().values('recipient').annotate(count=models.Count('pk')).values('count')
+        updated = User.objects.update(unread_notification_count=Coalesce(models.Subquery(unread, output_field=models.IntegerField()), 0))
+        invalidate_model(User)
+        return updated
+
+    def notify_subscribers(self, video, batch_size=None):
+        batch_size = batch_size or settings.NOTIFICATION_FANOUT_BATCH_SIZE
+        video_type = ContentType.objects.get_for_model(Video)
+        channel_type = ContentType.objects.get_for_model(Channel)
+        # Recipients notified by a previous run of the same job are skipped.
+        notified = self.filter(notification_type=Notification.NotificationType.VIDEO, action_type=video_type, action_id=video.pk).values('recipient')
+        recipients = Subscription.objects.filter(to_channel=video.channel_id).exclude(from_channel__user__in=notified).order_by().values_list('from_channel__user', flat=True).distinct()
+
+        batch = []
+        for recipient_id in recipients.iterator(chunk_size=batch_size):
+            batch.append(Notification(notification_type=Notification.NotificationType.VIDEO, actor_id=video.channel_id, recipient_id=recipient_id, action_type=video_type, action_id=video.pk, target_type=channel_type, target_id=video.channel_id))
+            if len(batch) >= batch_size:
+                self._bulk_create_unread(batch)
+                batch = []
+        self._bulk_create_unread(batch)
 
 class Notification(models.Model):
     class Meta:
-        ordering = ('-created',)
+        ordering = ('-updated',)
+        indexes = [
+            models.Index(fields=['action_type', 'action_id']),
+            models.Index(fields=['recipient', '-updated']),
+            models.Index(fields=['recipient', 'notification_type', 'target_type', 'target_id'], name='notification_aggregate_idx', condition=models.Q(unread=True)),
+            models.Index(fields=['updated'], name='notification_read_updated_idx', condition=models.Q(unread=False)),
+        ]
 
     class NotificationType(models.TextChoices):
         COMMENT = 'CO', 'New Comment'
         TAG = 'TA', 'Tagged User'
         VIDEO = 'VI', 'New Video'
 
+    # Comments and tags come in bursts on popular videos. Uploads are fanned
+    # out in bulk and one channel rarely publishes several within the window.
+    AGGREGATED_TYPES = (NotificationType.COMMENT, NotificationType.TAG)
+    # Enough actors are remembered to count repeat actors only once in all
+    # but the largest bursts, only the first few are shown.
+    TRACKED_ACTORS = 20
+    LATEST_ACTORS = 3
+
     notification_type = models.CharField(max_length=2, choices=NotificationType.choices)
     created = models.DateTimeField(default=timezone.now)
+    updated = models.DateTimeField(default=timezone.now)
     unread = models.BooleanField(default=True)
 
     actor = models.ForeignKey(Channel, on_delete=models.CASCADE)
+    actor_count = models.PositiveIntegerField(default=1)
+    # Comma separated pks of the most recent distinct actors, newest first.
+    latest_actors = models.CharField(max_length=255, blank=True)
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
 
     action_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='actions')
@@ -432,14 +748,98 @@ class Notification(models.Model):
 
     objects = NotificationManager()
 
+    @property
+    def latest_actor_ids(self):
+        return [ int(pk) for pk in self.latest_actors.split(',') if pk ] or [self.actor_id]
+
+    def add_actor(self, actor):
+        latest = self.latest_actor_ids
+        if actor.pk not in latest:
+            self.actor_count += 1
+        latest = [actor.pk] + [ pk for pk in latest if pk != actor.pk ]
+        self.latest_actors = ','.join(str(pk) for pk in latest[:self.TRACKED_ACTORS])
+        self.actor = actor
+
+class OutboxEvent(models.Model):
+    topic = models.CharField(max_length=50)
+    payload = models.TextField(default='{}')
+    created = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Claimed or failed events are skipped by dispatches until then.
+    available_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.topic} #{self.pk}'
+
 class WatchHistoryManager(models.Manager):
+    BUFFER_KEY = 'watch_history_buffer'
+    FLUSH_LOCK_KEY = 'watch_history_flush'
+
     def add_entry(self, channel, video):
+        redis = django_rq.get_connection()
+        redis.rpush(self.BUFFER_KEY, f'{channel.pk}:{video.pk}:{timezone.now().timestamp()}')
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        redis = django_rq.get_connection()
+        if redis.set(self.FLUSH_LOCK_KEY, 1, nx=True, ex=300):
+            django_rq.enqueue(tasks.flush_watch_history_task)
+
+    def flush_buffer(self, batch_size=1000):
+        redis = django_rq.get_connection()
         try:
-            entry = self.get(channel=channel, video=video)
-            entry.created = timezone.now()
-            entry.save()
-        except WatchHistory.DoesNotExist:
-            self.create(channel=channel, video=video)
+            while True:
+                pipe = redis.pipeline()
+                pipe.lrange(self.BUFFER_KEY, 0, batch_size - 1)
+                pipe.ltrim(self.BUFFER_KEY, batch_size, -1)
+                raw_entries, _ = pipe.execute()
+                if not raw_entries:
+                    break
+
+                entries = {}
+                for raw_entry in raw_entries:
+                    channel_id, video_id, timestamp = raw_entry.decode('utf-8').split(':')
+                    key = (int(channel_id), int(video_id))
+                    entries[key] = max(entries.get(key, 0), float(timestamp))
+
+                channel_ids = set(Channel.objects.filter(pk__in={ key[0] for key in entries }).values_list('pk', flat=True))
+                video_ids = set(Video.objects.filter(pk__in={ key[1] for key in entries }).values_list('pk', flat=True))
+                self.upsert_entries([ (channel_id, video_id, datetime.fromtimestamp(timestamp, tz=utc)) for (channel_id, video_id), timestamp in entries.items() if channel_id in channel_ids and video_id in video_ids ])
+                for channel_id in channel_ids:
+                    self.trim(channel_id)
+        finally:
+            redis.delete(self.FLUSH_LOCK_KEY)
+
+        # Entries pushed after the last read but before the lock was released
+        # did not schedule a flush of their own.
+        if redis.llen(self.BUFFER_KEY):
+            self.schedule_flush()
+
+    def upsert_entries(self, entries):
+        if not entries:
+            return
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        # A delayed flush must not move an entry back in time.
+        sql = 'INSERT INTO {table} ({channel}, {video}, {created}) VALUES (%s, %s, %s) ON CONFLICT ({channel}, {video}) DO UPDATE SET {created} = {greatest}({table}.{created}, excluded.{created})'.format(
+            table=quote_name(self.model._meta.db_table),
+            channel=quote_name('channel_id'),
+            video=quote_name('video_id'),
+            created=quote_name('created'),
+            greatest='MAX' if connection.vendor == 'sqlite' else 'GREATEST',
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [ (channel_id, video_id, connection.ops.adapt_datetimefield_value(created)) for channel_id, video_id, created in entries ])
+        # The raw upsert goes around cacheops.
+        for channel_id in { channel_id for channel_id, video_id, created in entries }:
+            invalidate_dict(self.model, {'channel_id' : channel_id}, using=self.db)
+
+    def trim(self, channel_id):
+        max_entries = settings.WATCH_HISTORY_MAX_ENTRIES
+        cutoff = list(self.filter(channel_id=channel_id).order_by('-created').values_list('created', flat=True)[max_entries - 1:max_entries])
+        if cutoff:
+            self.filter(channel_id=channel_id, created__lt=cutoff[0]).delete()
 
 class WatchHistory(models.Model):
     channel = models.ForeignKey(Channel, on_delete=models.CASCADE, related_name='watch_history')
@@ -448,6 +848,24 @@ class WatchHistory(models.Model):
 
     objects = WatchHistoryManager()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['channel', 'video'], name='unique_watch_history_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['channel', '-created']),
+        ]
+
+class RelatedVideo(models.Model):
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='neighbours')
+    neighbour = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='neighbour_of')
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['video', '-score']),
+        ]
+
 class Strike(models.Model):
     class CategoryChoices(models.TextChoices):
         COPYRIGHT = 'CY', 'Copyright'
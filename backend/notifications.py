@@ -0,0 +1,38 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+
+from .models import Video, Comment, Channel, Notification
+
+# Relations needed to serialize each kind of generic notification object.
+RELATED_FIELDS = {
+    Video : ('channel', 'image_set__primary_image'),
+    Comment : ('author',),
+}
+
+def load_notifications(notifications):
+    notifications = list(notifications)
+    action_field = Notification._meta.get_field('action_object')
+    target_field = Notification._meta.get_field('target_object')
+
+    wanted = defaultdict(set)
+    for notification in notifications:
+        wanted[notification.action_type_id].add(notification.action_id)
+        wanted[notification.target_type_id].add(notification.target_id)
+
+    # One query per content type instead of one per generic relation.
+    objects = {}
+    for content_type_id, ids in wanted.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        queryset = model._base_manager.select_related(*RELATED_FIELDS.get(model, ()))
+        objects[content_type_id] = queryset.in_bulk(ids)
+
+    # Actors of aggregated notifications are loaded together as well.
+    actor_ids = { pk for notification in notifications if notification.actor_count > 1 for pk in notification.latest_actor_ids[:Notification.LATEST_ACTORS] }
+    actors = Channel.objects.in_bulk(actor_ids) if actor_ids else {}
+
+    for notification in notifications:
+        action_field.set_cached_value(notification, objects[notification.action_type_id].get(notification.action_id))
+        target_field.set_cached_value(notification, objects[notification.target_type_id].get(notification.target_id))
+        notification.latest_actor_list = [ actors[pk] for pk in notification.latest_actor_ids[:Notification.LATEST_ACTORS] if pk in actors ]
+    return notifications
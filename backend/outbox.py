@@ -0,0 +1,126 @@
+import json
+
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+import django_rq
+
+from actstream import action
+
+from .models import OutboxEvent, Video, Comment, Channel, Image, Notification, delete_local_video_files, delete_remote_video_files
+from . import tasks
+
+DISPATCH_LOCK_KEY = 'outbox_dispatch'
+# A single delayed job, rescheduled for the earliest retry.
+RETRY_JOB_ID = 'outbox_retry'
+MAX_ATTEMPTS = 5
+# Claimed events are handed to another dispatch if this one dies.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+# Doubled after every failed attempt.
+RETRY_DELAY = timedelta(seconds=30)
+
+handlers = {}
+
+def handler(topic, atomic=True):
+    def register(func):
+        handlers[topic] = (func, atomic)
+        return func
+    return register
+
+def publish(topic, **payload):
+    OutboxEvent.objects.create(topic=topic, payload=json.dumps(payload, cls=DjangoJSONEncoder))
+    transaction.on_commit(schedule_dispatch)
+
+def schedule_dispatch():
+    redis = django_rq.get_connection()
+    if redis.set(DISPATCH_LOCK_KEY, 1, nx=True, ex=300):
+        django_rq.enqueue(tasks.dispatch_outbox_task)
+
+def pending_events():
+    return OutboxEvent.objects.filter(attempts__lt=MAX_ATTEMPTS)
+
+def claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        events = pending_events().select_for_update(skip_locked=True).filter(available_at__lte=now)
+        events = list(events.order_by('pk')[:batch_size])
+        OutboxEvent.objects.filter(pk__in=[ event.pk for event in events ]).update(available_at=now + CLAIM_TIMEOUT)
+    return events
+
+def run(event):
+    func, atomic = handlers[event.topic]
+    if atomic:
+        with transaction.atomic():
+            func(**json.loads(event.payload))
+    else:
+        func(**json.loads(event.payload))
+
+def dispatch(batch_size=100):
+    redis = django_rq.get_connection()
+    try:
+        while True:
+            # Handlers run outside of the claiming transaction so that they
+            # neither hold the row locks nor share a transaction.
+            events = claim(batch_size)
+            if not events:
+                break
+
+            handled, failed = [], []
+            for event in events:
+                try:
+                    run(event)
+                    handled.append(event.pk)
+                except Exception as e:
+                    event.attempts += 1
+                    event.last_error = repr(e)
+                    event.available_at = timezone.now() + RETRY_DELAY * 2 ** (event.attempts - 1)
+                    failed.append(event)
+            OutboxEvent.objects.filter(pk__in=handled).delete()
+            OutboxEvent.objects.bulk_update(failed, ['attempts', 'last_error', 'available_at'])
+    finally:
+        redis.delete(DISPATCH_LOCK_KEY)
+
+    # Events committed while the lock was held were not scheduled, failed
+    # ones are retried once their delay is over.
+    now = timezone.now()
+    if pending_events().filter(available_at__lte=now).exists():
+        schedule_dispatch()
+    retry_at = pending_events().filter(available_at__gt=now).aggregate(retry_at=Min('available_at'))['retry_at']
+    if retry_at is not None:
+        django_rq.get_queue().enqueue_at(retry_at, tasks.schedule_outbox_dispatch_task, job_id=RETRY_JOB_ID)
+
+# The fan-out commits batch by batch and skips recipients notified by a
+# previous attempt, the action is only sent once it went through.
+@handler('video.published', atomic=False)
+def video_published(video_id):
+    try:
+        video = Video.objects.select_related('channel').get(pk=video_id)
+    except Video.DoesNotExist:
+        return
+    Notification.objects.notify_subscribers(video)
+    action.send(video.channel, verb='uploaded', action_object=video)
+
+@handler('video.deleted')
+def video_deleted(folder):
+    delete_local_video_files(folder)
+    delete_remote_video_files(folder)
+
+@handler('image.deleted')
+def image_deleted(name):
+    Image._meta.get_field('image').storage.delete(name)
+
+@handler('comment.created')
+def comment_created(comment_id):
+    try:
+        comment = Comment.objects.select_related('author', 'video__channel').get(pk=comment_id)
+    except Comment.DoesNotExist:
+        return
+    action.send(comment.author, verb='commented', action_object=comment, target=comment.video)
+    if comment.author != comment.video.channel:
+        Notification.objects.notify(comment.video.channel.user_id, Notification.NotificationType.COMMENT, comment.author, comment, comment.video)
+    for channel in Channel.objects.filter(mentions__comment=comment).exclude(pk=comment.author_id):
+        Notification.objects.notify(channel.user_id, Notification.NotificationType.TAG, comment.author, comment, comment.video)
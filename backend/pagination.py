@@ -0,0 +1,210 @@
+import base64, binascii, datetime, decimal, json, uuid
+
+from collections.abc import Sequence
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorEncoder(json.JSONEncoder):
+    # DjangoJSONEncoder truncates datetimes to milliseconds, which would make
+    # rows sharing the same millisecond disappear between pages.
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, (decimal.Decimal, uuid.UUID)):
+            return str(o)
+        return super().default(o)
+
+
+class KeysetPage(Sequence):
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by filtering on the sort key of the last row seen
+    instead of using OFFSET, so every page costs the same as the first one.
+
+    The ordering must be made of model fields or annotations and is always
+    completed with the primary key to make it total. Counting the whole
+    queryset is opt-in through `with_count`.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None, with_count=False):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = self._get_ordering(ordering)
+        self.with_count = with_count
+
+    def _get_ordering(self, ordering):
+        ordering = list(ordering or self.object_list.query.order_by or self.object_list.model._meta.ordering or ['-pk'])
+        ordering = [ (name.lstrip('-'), name.startswith('-')) for name in ordering ]
+        if not any(name in ('pk', self.object_list.model._meta.pk.name) for name, _ in ordering):
+            ordering.append(('pk', ordering[0][1]))
+        return ordering
+
+    @cached_property
+    def count(self):
+        if not self.with_count:
+            return None
+        return self.object_list.count()
+
+    def _get_field(self, name):
+        opts = self.object_list.model._meta
+        field = None
+        for part in name.split('__'):
+            if part == 'pk':
+                field = opts.pk
+            else:
+                field = opts.get_field(part)
+            if field.is_relation:
+                opts = field.related_model._meta
+        return field
+
+    def _get_value(self, obj, name):
+        value = obj
+        for part in name.split('__'):
+            value = getattr(value, part)
+        return value
+
+    def encode_cursor(self, obj, reverse=False):
+        values = [ self._get_value(obj, name) for name, _ in self.ordering ]
+        payload = json.dumps({'v' : values, 'r' : reverse}, cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise InvalidCursor('Invalid cursor.')
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor('Invalid cursor.')
+
+        decoded = []
+        for (name, _), value in zip(self.ordering, values):
+            try:
+                field = self._get_field(name)
+            except FieldDoesNotExist:
+                # Annotations are stored as plain JSON values.
+                decoded.append(value)
+                continue
+            try:
+                decoded.append(field.to_python(value))
+            except ValidationError:
+                raise InvalidCursor('Invalid cursor.')
+        return decoded, reverse
+
+    def _keyset_filter(self, values, reverse):
+        condition = Q()
+        for i, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            term = Q(**{f'{name}__{lookup}' : values[i]})
+            for (previous_name, _), previous_value in zip(self.ordering[:i], values[:i]):
+                term &= Q(**{previous_name : previous_value})
+            condition |= term
+        return condition
+
+    def page(self, cursor=None):
+        queryset = self.object_list
+        reverse = False
+        if cursor:
+            values, reverse = self.decode_cursor(cursor)
+            queryset = queryset.filter(self._keyset_filter(values, reverse))
+
+        order_by = [ ('-' if descending != reverse else '') + name for name, descending in self.ordering ]
+        items = list(queryset.order_by(*order_by)[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+
+        next_cursor = previous_cursor = None
+        if reverse:
+            items.reverse()
+            if items:
+                next_cursor = self.encode_cursor(items[-1])
+                if has_more:
+                    previous_cursor = self.encode_cursor(items[0], reverse=True)
+        elif items:
+            if has_more:
+                next_cursor = self.encode_cursor(items[-1])
+            if cursor:
+                previous_cursor = self.encode_cursor(items[0], reverse=True)
+        return KeysetPage(items, self, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class IdListPaginator:
+    """
+    Pages through a precomputed list of primary keys, such as cached search
+    results, and only loads the rows of the requested page. Cursors are
+    offsets into the list.
+    """
+
+    def __init__(self, ids, per_page, queryset):
+        self.ids = ids
+        self.per_page = int(per_page)
+        self.queryset = queryset
+
+    @property
+    def count(self):
+        return len(self.ids)
+
+    def page(self, cursor=None):
+        offset = 0
+        if cursor:
+            try:
+                offset = int(cursor)
+            except ValueError:
+                raise InvalidCursor('Invalid cursor.')
+            if offset < 0 or offset >= len(self.ids):
+                raise InvalidCursor('Invalid cursor.')
+
+        ids = self.ids[offset:offset + self.per_page]
+        objects = self.queryset.in_bulk(ids)
+        # Rows hidden since the list was built are skipped.
+        items = [ objects[pk] for pk in ids if pk in objects ]
+
+        next_cursor = str(offset + self.per_page) if offset + self.per_page < len(self.ids) else None
+        previous_cursor = str(max(offset - self.per_page, 0)) if offset else None
+        return KeysetPage(items, self, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
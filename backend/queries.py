@@ -1,29 +1,25 @@
-import random
 from datetime import timedelta
 
-from django.db.models import Sum, Count
+from django.db.models import Count
 from django.utils import timezone
 
-from .models import Video, Category, Channel, Likes, Dislikes, Subscription, User, Image, CommentLike, CommentDislike, Comment
+from . import activity, comments, notifications, recommendations, search, suggestions
+from .models import Video, Category, Channel, ChannelStats, Likes, Dislikes, Subscription, User, Image, CommentLike, CommentDislike, Comment
 
 def get_user(pk):
 	return User.objects.get(pk=pk)
 
 def get_latest_videos():
-	return Video.published_objects.annotate(like_count=Count('likes__id'), sub_count=Count('channel__subscriptions__id')).order_by('-like_count', '-sub_count', '-views', '-created').filter(visibility__exact=Video.VisibilityStatus.PUBLIC)
+	return Video.listed_objects.annotate(like_count=Count('likes__id'), sub_count=Count('channel__subscriptions__id')).order_by('-like_count', '-sub_count', '-views', '-created').select_related('channel', 'image_set__primary_image')
 
 def get_videos_from_category(category):
-	return Video.published_objects.filter(category=category, visibility__exact=Video.VisibilityStatus.PUBLIC).order_by('-created')
+	return Video.listed_objects.filter(category=category).select_related('channel', 'image_set__primary_image').order_by('-created')
 
 def get_recommended_videos():
-	videos = Video.published_objects.filter(visibility__exact=Video.VisibilityStatus.PUBLIC)
-	if videos:
-		if videos.count() > 25:
-			start = random.randint(0, videos.count()-21)
-			return videos[start:start+20]
-		else:
-			return videos
-	return None
+	return recommendations.get_recommended_videos()
+
+def get_related_videos(video):
+	return recommendations.get_related_videos(video)
 
 def get_video(watch_id):
 	try:
@@ -38,14 +34,24 @@ def get_published_video_or_none(watch_id):
 		return None
 
 def get_videos_from_channel(channel):
-	return Video.published_objects.filter(channel__exact=channel, visibility__exact=Video.VisibilityStatus.PUBLIC)
+	return Video.listed_objects.filter(channel__exact=channel)
 
 def filter_by_search_terms(search_terms):
-	return Video.published_objects.search(search_terms)
+	return search.get_search_backend().search(search_terms)
+
+def get_search_results(search_terms):
+	return search.get_search_results(search_terms)
+
+def get_public_videos():
+	return Video.listed_objects.all().select_related('channel', 'image_set__primary_image')
+
+def get_search_suggestions(prefix):
+	return suggestions.get_suggestions(prefix)
 
 def get_sub_feed(channel):
-	subs = channel.subscribers.all()
-	return Video.objects.filter(channel__in=[ sub.to_channel for sub in subs.all() ]).order_by('-created')
+	subscriptions = Subscription.objects.filter(from_channel=channel).values('to_channel')
+	videos = Video.listed_objects.filter(channel__in=subscriptions)
+	return videos.select_related('channel', 'image_set__primary_image').order_by('-created', '-pk')
 
 def get_all_categories():
 	return Category.objects.all()
@@ -57,7 +63,7 @@ def get_all_channels():
 	return Channel.objects.filter(user__banned=False)
 
 def get_channel(from_user):
-	return Channel.objects.filter(user__exact=from_user)[0]
+	return Channel.objects.get_selected(from_user)
 
 def get_channel_by_id(channel_id):
 	try:
@@ -65,8 +71,13 @@ def get_channel_by_id(channel_id):
 	except Channel.DoesNotExist:
 		return None
 
-def get_total_views(channel):
-	return channel.videos.all().aggregate(Sum('views'))['views__sum'] or 0
+def get_channel_stats(channel):
+	return ChannelStats.objects.get_for_channel(channel)
+
+def get_featured_video(stats):
+	if stats.featured_video_id is None:
+		return None
+	return Video.listed_objects.filter(pk=stats.featured_video_id).select_related('channel').first()
 
 def _get_likes(from_video):
 	return Likes.objects.filter(video__exact=from_video).count()
@@ -91,7 +102,7 @@ def toggle_like(to_video, from_channel):
 		like[0].delete()
 		return (_get_likes(to_video), _get_dislikes(to_video))
 
-	Likes.objects.create(channel=from_channel, video=to_video)
+	Likes.objects.get_or_create(channel=from_channel, video=to_video)
 	return (_get_likes(to_video), _get_dislikes(to_video))
 
 def toggle_dislike(to_video, from_channel):
@@ -103,7 +114,7 @@ def toggle_dislike(to_video, from_channel):
 		dislike[0].delete()
 		return (_get_likes(to_video), _get_dislikes(to_video))
 
-	Dislikes.objects.create(channel=from_channel, video=to_video)
+	Dislikes.objects.get_or_create(channel=from_channel, video=to_video)
 	return (_get_likes(to_video), _get_dislikes(to_video))
 
 def is_video_liked(to_video, from_channel):
@@ -117,7 +128,7 @@ def toggle_subscription(to_channel, from_channel):
 	if sub.exists():
 		sub[0].delete()
 	else:
-		Subscription.objects.create(from_channel=from_channel, to_channel=to_channel)
+		Subscription.objects.get_or_create(from_channel=from_channel, to_channel=to_channel)
 	return get_subscriber_count(to_channel)
 
 def get_subscriber_count(channel):
@@ -129,7 +140,7 @@ def is_subscribed(to_channel, from_channel):
 def increment_view_count(watch_id):
 	video = get_video(watch_id)
 	video.views += 1
-	video.save()
+	video.save(update_fields=['views'])
 	return video.views
 
 def get_image_by_pk(pk):
@@ -158,7 +169,7 @@ def toggle_comment_like(comment, channel):
 		like[0].delete()
 		return (comment.likes.count(), comment.dislikes.count())
 
-	CommentLike.objects.create(comment=comment, channel=channel)
+	CommentLike.objects.get_or_create(comment=comment, channel=channel)
 	return (comment.likes.count(), comment.dislikes.count())
 
 
@@ -171,8 +182,29 @@ def toggle_comment_dislike(comment, channel):
 		dislike[0].delete()
 		return (comment.likes.count(), comment.dislikes.count())
 
-	CommentDislike.objects.create(comment=comment, channel=channel)
+	CommentDislike.objects.get_or_create(comment=comment, channel=channel)
 	return (comment.likes.count(), comment.dislikes.count())
 
 def get_comment(pk):
-	return Comment.objects.get(pk=pk)
\ No newline at end of file
+	return Comment.objects.get(pk=pk)
+
+def get_comment_threads(video):
+	return comments.get_comment_threads(video)
+
+def get_comment_replies(comment):
+	return comments.get_replies(comment)
+
+def attach_comment_replies(comment_list):
+	return comments.attach_replies(comment_list)
+
+def get_comments_mentioning(channel):
+	return Comment.objects.filter(mentions__channel=channel).select_related('author', 'video').order_by('-created')
+
+def load_notifications(notification_list):
+	return notifications.load_notifications(notification_list)
+
+def get_channel_activity(channel):
+	return activity.get_channel_activity(channel)
+
+def get_channel_comment_activity(channel):
+	return activity.get_channel_comments(channel)
\ No newline at end of file
@@ -0,0 +1,141 @@
+import random
+
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+import django_rq
+
+from .models import Video, WatchHistory, RelatedVideo
+from . import tasks
+
+POOL_CACHE_KEY = 'recommendation_pool'
+POOL_LOCK_KEY = 'recommendation_pool_refreshing'
+
+def build_recommendation_pool():
+    videos = Video.listed_objects.all()
+    pool = list(videos.order_by('?').values_list('pk', flat=True)[:settings.RECOMMENDATION_POOL_SIZE])
+    # Keep the pool around twice as long as it is considered fresh so a stale
+    # pool can still be served while the refresh job is running.
+    cache.set(POOL_CACHE_KEY, (timezone.now(), pool), settings.RECOMMENDATION_POOL_TIMEOUT * 2)
+    cache.delete(POOL_LOCK_KEY)
+    return pool
+
+def schedule_pool_refresh():
+    if cache.add(POOL_LOCK_KEY, True, 60):
+        django_rq.enqueue(tasks.refresh_recommendation_pool_task)
+
+def get_recommendation_pool():
+    cached = cache.get(POOL_CACHE_KEY)
+    if cached is None:
+        # Building the pool sorts the whole listed catalog, requests leave it
+        # to the background job.
+        schedule_pool_refresh()
+        return None
+
+    built_at, pool = cached
+    age = (timezone.now() - built_at).total_seconds()
+    if age > settings.RECOMMENDATION_POOL_TIMEOUT:
+        schedule_pool_refresh()
+    return pool
+
+def get_recommended_videos(count=20):
+    pool = get_recommendation_pool()
+    videos = Video.listed_objects.select_related('channel', 'image_set__primary_image')
+    if pool is None:
+        # The newest listed videos come straight from the partial index
+        # until the pool has been built.
+        return list(videos.order_by('-created')[:count]) or None
+    if not pool:
+        return None
+
+    ids = random.sample(pool, min(count, len(pool)))
+    videos = list(videos.filter(pk__in=ids))
+    random.shuffle(videos)
+    return videos
+
+def _load_coview_matrix(batch_size):
+    channels, videos = [], []
+    history = WatchHistory.objects.order_by().values_list('channel_id', 'video_id')
+    batch = []
+    for entry in history.iterator(chunk_size=batch_size):
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            pairs = np.array(batch, dtype=np.int64)
+            channels.append(pairs[:, 0])
+            videos.append(pairs[:, 1])
+            batch = []
+    if batch:
+        pairs = np.array(batch, dtype=np.int64)
+        channels.append(pairs[:, 0])
+        videos.append(pairs[:, 1])
+
+    if not videos:
+        return None, None
+
+    channel_ids, rows = np.unique(np.concatenate(channels), return_inverse=True)
+    video_ids, cols = np.unique(np.concatenate(videos), return_inverse=True)
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(channel_ids), len(video_ids)))
+    # Repeated views are summed by the constructor, we only care whether a
+    # channel has watched a video at all.
+    matrix.data[:] = 1
+    return matrix, video_ids
+
+def compute_coview_neighbours(k=20, history_batch_size=10000, column_batch_size=1000):
+    matrix, video_ids = _load_coview_matrix(history_batch_size)
+    if matrix is None:
+        return
+
+    norms = np.sqrt(np.asarray(matrix.sum(axis=0)).ravel())
+    normalized = (matrix @ sparse.diags(1 / norms)).tocsc()
+    transposed = normalized.T.tocsr()
+
+    for start in range(0, len(video_ids), column_batch_size):
+        end = min(start + column_batch_size, len(video_ids))
+        similarities = (transposed @ normalized[:, start:end]).tocsc()
+        for column in range(end - start):
+            lo, hi = similarities.indptr[column], similarities.indptr[column + 1]
+            indices = similarities.indices[lo:hi]
+            scores = similarities.data[lo:hi]
+
+            mask = indices != start + column
+            indices, scores = indices[mask], scores[mask]
+            if len(indices) > k:
+                top = np.argpartition(scores, -k)[-k:]
+                indices, scores = indices[top], scores[top]
+
+            video_id = int(video_ids[start + column])
+            for index, score in zip(indices, scores):
+                yield video_id, int(video_ids[index]), float(score)
+
+def _replace_related_videos(video_ids, related):
+    with transaction.atomic():
+        RelatedVideo.objects.filter(video__in=video_ids).delete()
+        RelatedVideo.objects.bulk_create(related)
+
+def build_related_videos(k=20, history_batch_size=10000, column_batch_size=1000, insert_batch_size=1000):
+    # Neighbours are swapped a few videos at a time, readers keep seeing the
+    # previous neighbours of the videos that have not been reached yet.
+    built, video_ids, related = set(), set(), []
+    for video_id, neighbour_id, score in compute_coview_neighbours(k=k, history_batch_size=history_batch_size, column_batch_size=column_batch_size):
+        if video_id not in video_ids and len(related) >= insert_batch_size:
+            _replace_related_videos(video_ids, related)
+            built |= video_ids
+            video_ids, related = set(), []
+        video_ids.add(video_id)
+        related.append(RelatedVideo(video_id=video_id, neighbour_id=neighbour_id, score=score))
+    if related:
+        _replace_related_videos(video_ids, related)
+        built |= video_ids
+
+    stale = list(set(RelatedVideo.objects.values_list('video', flat=True).distinct()) - built)
+    for start in range(0, len(stale), insert_batch_size):
+        RelatedVideo.objects.filter(video__in=stale[start:start + insert_batch_size]).delete()
+
+def get_related_videos(video, count=20):
+    videos = Video.listed_objects.filter(neighbour_of__video=video)
+    return list(videos.select_related('channel', 'image_set__primary_image').order_by('-neighbour_of__score')[:count])
@@ -0,0 +1,170 @@
+import hashlib, sqlite3
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Video
+
+FTS_TABLE = 'backend_video_fts'
+# The trigram tokenizer gives substring matching close to what pg_trgm does,
+# it only exists from SQLite 3.34 onwards.
+FTS_TRIGRAM = sqlite3.sqlite_version_info >= (3, 34, 0)
+# bm25 weights of the title, channel name and description columns.
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+# Part of every cached result key, bumped whenever a video enters or leaves
+# the public listings so that all cached results are dropped at once.
+GENERATION_CACHE_KEY = 'search_generation'
+
+# The index is an external content table reading the text through this
+# view. The view and the sync triggers reference both the video and the
+# channel table, SQLite refuses to rename either of them while they exist:
+# they are dropped around migrations and installed again afterwards.
+SEARCH_VIEW = 'backend_video_search'
+SQLITE_VIEW_SQL = f"""
+    CREATE VIEW {SEARCH_VIEW} AS
+    SELECT backend_video.id AS id, backend_video.title AS title, backend_channel.name AS channel_name, backend_video.description AS description
+    FROM backend_video INNER JOIN backend_channel ON backend_channel.id = backend_video.channel_id
+"""
+
+FTS_REBUILD_SQL = [
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')",
+]
+
+SQLITE_TRIGGERS = {
+    'backend_video_fts_insert' : """
+        CREATE TRIGGER backend_video_fts_insert AFTER INSERT ON backend_video BEGIN
+            INSERT INTO backend_video_fts(rowid, title, channel_name, description)
+            VALUES (NEW.id, NEW.title, (SELECT name FROM backend_channel WHERE id = NEW.channel_id), NEW.description);
+        END
+    """,
+    'backend_video_fts_delete' : """
+        CREATE TRIGGER backend_video_fts_delete AFTER DELETE ON backend_video BEGIN
+            INSERT INTO backend_video_fts(backend_video_fts, rowid, title, channel_name, description)
+            VALUES ('delete', OLD.id, OLD.title, (SELECT name FROM backend_channel WHERE id = OLD.channel_id), OLD.description);
+        END
+    """,
+    'backend_video_fts_update' : """
+        CREATE TRIGGER backend_video_fts_update AFTER UPDATE OF title, description, channel_id ON backend_video BEGIN
+            INSERT INTO backend_video_fts(backend_video_fts, rowid, title, channel_name, description)
+            VALUES ('delete', OLD.id, OLD.title, (SELECT name FROM backend_channel WHERE id = OLD.channel_id), OLD.description);
+            INSERT INTO backend_video_fts(rowid, title, channel_name, description)
+            VALUES (NEW.id, NEW.title, (SELECT name FROM backend_channel WHERE id = NEW.channel_id), NEW.description);
+        END
+    """,
+    'backend_channel_fts_update' : """
+        CREATE TRIGGER backend_channel_fts_update AFTER UPDATE OF name ON backend_channel BEGIN
+            INSERT INTO backend_video_fts(backend_video_fts, rowid, title, channel_name, description)
+            SELECT 'delete', id, title, OLD.name, description FROM backend_video WHERE channel_id = OLD.id;
+            INSERT INTO backend_video_fts(rowid, title, channel_name, description)
+            SELECT id, title, NEW.name, description FROM backend_video WHERE channel_id = NEW.id;
+        END
+    """,
+}
+
+def rebuild_sqlite_index(cursor):
+    for sql in FTS_REBUILD_SQL:
+        cursor.execute(sql)
+
+def drop_sqlite_triggers(connection):
+    with connection.cursor() as cursor:
+        for name in SQLITE_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP VIEW IF EXISTS {SEARCH_VIEW}')
+
+def install_sqlite_triggers(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view', 'trigger')")
+        existing = { row[0] for row in cursor.fetchall() }
+        if FTS_TABLE not in existing:
+            return
+        missing = [ name for name in [SEARCH_VIEW, *SQLITE_TRIGGERS] if name not in existing ]
+        for name in missing:
+            cursor.execute(SQLITE_VIEW_SQL if name == SEARCH_VIEW else SQLITE_TRIGGERS[name])
+        if missing:
+            # Rows may have been written while the triggers were gone.
+            rebuild_sqlite_index(cursor)
+
+class BaseSearchBackend:
+
+    def search(self, query):
+        raise NotImplementedError('Subclasses of BaseSearchBackend must provide a search() method.')
+
+    def search_ids(self, query, limit=None):
+        ids = self.search(query).values_list('pk', flat=True)
+        if limit is not None:
+            ids = ids[:limit]
+        return list(ids)
+
+    def rebuild(self):
+        pass
+
+class PostgresSearchBackend(BaseSearchBackend):
+
+    def search(self, query):
+        return Video.listed_objects.search(query)
+
+    def rebuild(self):
+        # The video triggers recompute every vector that has been reset.
+        Video.objects.update(search_vector=None)
+
+class SQLiteSearchBackend(BaseSearchBackend):
+
+    def _match_expression(self, query):
+        terms = []
+        for term in query.split():
+            if FTS_TRIGRAM and len(term) < 3:
+                # Shorter strings cannot match anything in a trigram index.
+                continue
+            term = '"%s"' % term.replace('"', '""')
+            terms.append(term if FTS_TRIGRAM else term + '*')
+        return ' OR '.join(terms)
+
+    def search(self, query):
+        qs = Video.listed_objects.all()
+        match = self._match_expression(query)
+        if not match:
+            return qs.none()
+
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        # bm25() is lower for better matches, it is negated so that results
+        # are ordered by descending score like the Postgres backend.
+        score = RawSQL(f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = backend_video.id', (match,))
+        candidates = qs.filter(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,)))
+        return candidates.annotate(score=score).order_by('-score', '-pk')
+
+    def rebuild(self):
+        with connections[router.db_for_write(Video)].cursor() as cursor:
+            rebuild_sqlite_index(cursor)
+
+def get_search_backend():
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)()
+    vendor = connections[router.db_for_read(Video)].vendor
+    if vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    return PostgresSearchBackend()
+
+def normalize_query(query):
+    return ' '.join(query.casefold().split())
+
+def get_search_generation():
+    return cache.get_or_set(GENERATION_CACHE_KEY, 1, None)
+
+def bump_search_generation():
+    try:
+        cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        cache.set(GENERATION_CACHE_KEY, 1, None)
+
+def get_search_results(query):
+    query = normalize_query(query)
+    digest = hashlib.md5(query.encode('utf-8')).hexdigest()
+    key = f'search_results:{get_search_generation()}:{digest}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = get_search_backend().search_ids(query, settings.SEARCH_RESULTS_LIMIT)
+        cache.set(key, ids, settings.SEARCH_CACHE_TIMEOUT)
+    return ids
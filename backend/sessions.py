@@ -0,0 +1,93 @@
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+import django_rq
+
+from qsessions import IP_SESSION_KEY, USER_AGENT_SESSION_KEY
+from qsessions.backends.cached_db import SessionStore as CachedDBStore
+
+from . import tasks
+
+ACTIVITY_BUFFER_KEY = 'session_activity_buffer'
+FLUSH_LOCK_KEY = 'session_activity_flush'
+METADATA_KEYS = (IP_SESSION_KEY, USER_AGENT_SESSION_KEY)
+
+def without_metadata(data):
+    return { key : value for key, value in data.items() if key not in METADATA_KEYS }
+
+class SessionStore(CachedDBStore):
+    """
+    Cached qsessions store. Sessions are read from the cache first and only
+    fall back to the database on a miss. Saves that only change the IP or
+    user agent go to the cache, the database row is updated later by
+    flush_activity().
+    """
+
+    cache_key_prefix = 'backend.sessions.'
+
+    def load(self):
+        data = super().load()
+        self._loaded_data = without_metadata(data)
+        return data
+
+    def save(self, must_create=False):
+        loaded_data = getattr(self, '_loaded_data', None)
+        if must_create or self.session_key is None or loaded_data is None or without_metadata(self._session) != loaded_data:
+            super().save(must_create)
+            self._loaded_data = without_metadata(self._session)
+            return
+
+        self[USER_AGENT_SESSION_KEY] = self.user_agent
+        self[IP_SESSION_KEY] = self.ip
+        self._cache.set(self.cache_key, self._session, self.get_expiry_age())
+        record_activity(self.session_key, self.ip, self.user_agent, self.get_expiry_date())
+
+def record_activity(session_key, ip, user_agent, expire_date):
+    redis = django_rq.get_connection()
+    entry = {'ip' : ip, 'user_agent' : user_agent, 'expire_date' : expire_date, 'updated_at' : timezone.now()}
+    # Later activity of the same session replaces the pending one.
+    redis.hset(ACTIVITY_BUFFER_KEY, session_key, json.dumps(entry, cls=DjangoJSONEncoder))
+    schedule_flush()
+
+def schedule_flush():
+    redis = django_rq.get_connection()
+    if redis.set(FLUSH_LOCK_KEY, 1, nx=True, ex=300):
+        django_rq.enqueue(tasks.flush_session_activity_task)
+
+def flush_activity():
+    from qsessions.models import Session
+
+    redis = django_rq.get_connection()
+    try:
+        pipe = redis.pipeline()
+        pipe.hgetall(ACTIVITY_BUFFER_KEY)
+        pipe.delete(ACTIVITY_BUFFER_KEY)
+        entries, _ = pipe.execute()
+
+        gone = []
+        with transaction.atomic():
+            for session_key, entry in entries.items():
+                session_key = session_key.decode('utf-8')
+                entry = json.loads(entry)
+                updated = Session.objects.filter(session_key=session_key).update(
+                    ip=entry['ip'],
+                    user_agent=entry['user_agent'],
+                    expire_date=parse_datetime(entry['expire_date']),
+                    updated_at=parse_datetime(entry['updated_at']),
+                )
+                if not updated:
+                    gone.append(session_key)
+        # A request that was still running when its session got deleted may
+        # have put it back in the cache.
+        caches[settings.SESSION_CACHE_ALIAS].delete_many([ SessionStore.cache_key_prefix + session_key for session_key in gone ])
+    finally:
+        redis.delete(FLUSH_LOCK_KEY)
+
+    if redis.hlen(ACTIVITY_BUFFER_KEY):
+        schedule_flush()
@@ -1,59 +1,133 @@
-import base64, fixedint, re
-
-from django.db.models.signals import post_save, pre_delete
+from django.db import connections
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete, pre_migrate, post_migrate
 from django.dispatch import receiver
 
-from actstream import action
+from .models import User, Video, Channel, ChannelStats, Subscription, Image, Comment, VideoStrike, get_video_location
+from .search import drop_sqlite_triggers, install_sqlite_triggers, bump_search_generation
+from .suggestions import record_changes
+from . import outbox
+
+# The triggers and the content view of the index reference both the video and
+# the channel table, SQLite refuses to rename either of them while they exist.
+# They are only dropped when backend migrations run, install_search_triggers()
+# rebuilds the index whenever it has to put them back.
+@receiver(pre_migrate)
+def drop_search_triggers(sender, using, plan=None, **kwargs):
+    if sender.name != 'backend' or connections[using].vendor != 'sqlite':
+        return
+    if any(migration.app_label == 'backend' for migration, backwards in plan or ()):
+        drop_sqlite_triggers(connections[using])
+
+@receiver(post_migrate)
+def install_search_triggers(sender, using, **kwargs):
+    if sender.name == 'backend' and connections[using].vendor == 'sqlite':
+        install_sqlite_triggers(connections[using])
+
+# Fields that decide whether a video is listed. They are
+# read from __dict__ so that deferred fields are not loaded.
+LISTING_FIELDS = {
+    Video : ('published', 'visibility', 'transcode_status'),
+    User : ('banned',),
+}
+
+def get_listing_state(instance):
+    return tuple(instance.__dict__.get(name) for name in LISTING_FIELDS[type(instance)])
+
+@receiver(post_init, sender=Video)
+@receiver(post_init, sender=User)
+def remember_listing_state(sender, instance, **kwargs):
+    instance._listing_state = get_listing_state(instance)
+
+@receiver(post_save, sender=Video)
+@receiver(post_save, sender=User)
+def update_listing(sender, instance, update_fields=None, **kwargs):
+    state = get_listing_state(instance)
+    # A full save writes back whatever is_listed the instance was loaded with.
+    if state != instance._listing_state or (sender is Video and update_fields is None):
+        if sender is Video:
+            changed = Video.listed_objects.update_listing(pk=instance.pk)
+            instance.is_listed = Video._base_manager.filter(pk=instance.pk).values_list('is_listed', flat=True).first()
+            if changed:
+                record_changes([instance.title])
+        else:
+            changed = Video.listed_objects.update_listing(channel__user=instance)
+            if changed:
+                ChannelStats.objects.mark_dirty(instance.channels.values_list('pk', flat=True))
+            titles = Video._base_manager.filter(channel__user=instance).values_list('title', flat=True)
+            record_changes(list(titles) + list(instance.channels.values_list('name', flat=True)))
+        if changed:
+            bump_search_generation()
+    instance._listing_state = state
+
+# Texts offered as search suggestions. Edits record both the old and the new
+# text so that the suggestion index drops one and picks up the other.
+SUGGESTION_FIELDS = {
+    Video : 'title',
+    Channel : 'name',
+}
 
-from .models import Video, Channel, Image, Comment, Notification
+@receiver(post_init, sender=Video)
+@receiver(post_init, sender=Channel)
+def remember_suggestion_text(sender, instance, **kwargs):
+    instance._suggestion_text = instance.__dict__.get(SUGGESTION_FIELDS[sender])
 
+@receiver(post_save, sender=Video)
 @receiver(post_save, sender=Channel)
-def generate_channel_id(sender, instance, **kwargs):
-    if not instance.channel_id:
-        instance.channel_id = base64.urlsafe_b64encode(fixedint.Int64(hash(str(instance.id+1))).to_bytes()).decode('UTF-8')[:-1]
-        instance.save()
+def record_suggestion_text(sender, instance, **kwargs):
+    text = instance.__dict__.get(SUGGESTION_FIELDS[sender])
+    if text != instance._suggestion_text:
+        record_changes([ value for value in (instance._suggestion_text, text) if value ])
+    instance._suggestion_text = text
+
+@receiver(post_save, sender=VideoStrike)
+@receiver(post_delete, sender=VideoStrike)
+def update_struck_listing(sender, instance, **kwargs):
+    if Video.listed_objects.update_listing(pk=instance.video_id):
+        video = Video.objects.filter(pk=instance.video_id).values('channel_id', 'title').first()
+        ChannelStats.objects.mark_dirty([video['channel_id']])
+        record_changes([video['title']])
+    bump_search_generation()
+
+@receiver(post_delete, sender=Video)
+def drop_search_results(sender, instance, **kwargs):
+    if instance.is_listed:
+        record_changes([instance.title])
+    bump_search_generation()
 
 @receiver(post_save, sender=Video)
-def generate_watch_id(sender, instance, created, **kwargs):
-    if hasattr(instance, '_dirty'):
-        return
-    if not instance.watch_id:
-        instance.watch_id = base64.urlsafe_b64encode(fixedint.Int64(hash(str(instance.id))).to_bytes()).decode('UTF-8')[:-1]
-        try:
-            instance._dirty = True
-            instance.save()
-        finally:
-            del instance._dirty
-    else:
-        if not instance.subs_notified and instance.published and instance.transcode_status == instance.TranscodeStatus.DONE and instance.visibility == instance.VisibilityStatus.PUBLIC:
-            action.send(instance.channel, verb='uploaded', action_object=instance)
-            subs = [ sub.from_channel.user for sub in instance.channel.subscriptions.all() ]
-            for sub in subs:
-                Notification.objects.create(notification_type=Notification.NotificationType.VIDEO, actor=instance.channel, action_object=instance, target_object=instance.channel, recipient=sub)
-            instance.subs_notified = True
-            try:
-                instance._dirty = True
-                instance.save()
-            finally:
-                del instance._dirty
+@receiver(post_delete, sender=Video)
+def refresh_video_channel_stats(sender, instance, **kwargs):
+    ChannelStats.objects.mark_dirty([instance.channel_id])
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def refresh_subscribed_channel_stats(sender, instance, **kwargs):
+    ChannelStats.objects.mark_dirty([instance.to_channel_id])
+
+@receiver(post_save, sender=Channel)
+@receiver(post_delete, sender=Channel)
+def forget_selected_channel(sender, instance, **kwargs):
+    Channel.objects.forget_selected(instance.user_id)
+
+@receiver(post_save, sender=Video)
+def notify_subscribers(sender, instance, **kwargs):
+    if not instance.subs_notified and instance.published and instance.transcode_status == instance.TranscodeStatus.DONE and instance.visibility == instance.VisibilityStatus.PUBLIC:
+        outbox.publish('video.published', video_id=instance.pk)
+        instance.subs_notified = True
+        # Cached copies of the video must not write the flag back.
+        Video.objects.filter(pk=instance.pk).invalidated_update(subs_notified=True)
 
 @receiver(pre_delete, sender=Image)
 def delete_image_files(sender, instance, using, **kwargs):
-    instance.image.delete()
+    if instance.image:
+        outbox.publish('image.deleted', name=instance.image.name)
 
 @receiver(pre_delete, sender=Video)
 def delete_video_files(sender, instance, using, **kwargs):
-    instance.delete_local_files()
-    instance.delete_remote_files()
+    outbox.publish('video.deleted', folder=get_video_location(instance))
 
 @receiver(post_save, sender=Comment)
 def send_comment_notification(sender, instance, created, **kwargs):
     if created:
-        action.send(instance.author, verb='commented', action_object=instance, target=instance.video)
-        if instance.author != instance.video.channel:
-            Notification.objects.create(notification_type=Notification.NotificationType.COMMENT, actor=instance.author, action_object=instance, target_object=instance.video, recipient=instance.video.channel.user)
-        tags = re.findall('@\(\w+\)\[([aA-zZ0-9-_]+)\]', instance.text)
-        if tags:
-            for channel in Channel.objects.filter(channel_id__in=tags):
-                if instance.author != channel:
-                    Notification.objects.create(notification_type=Notification.NotificationType.TAG, actor=instance.author, action_object=instance, target_object=instance.video, recipient=channel.user)
+        instance.sync_mentions(created=True)
+        outbox.publish('comment.created', comment_id=instance.pk)
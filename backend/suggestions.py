@@ -0,0 +1,184 @@
+import bisect, heapq, threading, time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+import django_rq
+
+from .models import Video, Channel
+from .search import normalize_query
+
+# Prefixes up to this length match too many keys to be scanned on every
+# keystroke, their completions are computed when the index is built.
+SHORT_PREFIX_LENGTH = 2
+# Longer prefixes matching more keys than this have their ranking kept
+# around after the first lookup.
+SCAN_LIMIT = 1000
+SUGGESTION_LIMIT = 10
+# Texts whose listed videos or channels changed, scored by the time of the
+# change. Every process applies the changes made since its last refresh.
+CHANGES_KEY = 'suggestion_changes'
+# Covers changes committed while a refresh was reading the set.
+CHANGES_LOOKBACK = 60
+
+class PrefixIndex:
+
+    def __init__(self, entries=(), limit=SUGGESTION_LIMIT):
+        self.limit = limit
+        self.entries = {}
+        for text, weight in entries:
+            key = normalize_query(text)
+            if key and (key not in self.entries or self.entries[key][1] < weight):
+                self.entries[key] = (text, weight)
+        self.keys = sorted(self.entries)
+
+        # Ranked keys of the prefixes that match too many keys to be ranked
+        # on every lookup.
+        self.top = {}
+        for key, (text, weight) in self.entries.items():
+            for length in range(1, min(SHORT_PREFIX_LENGTH, len(key)) + 1):
+                self.top.setdefault(key[:length], []).append((weight, key))
+        for prefix, candidates in self.top.items():
+            self.top[prefix] = [ key for _, key in heapq.nlargest(limit, candidates) ]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _weight(self, key):
+        # Lookups run while the refresh thread changes the index, a key may
+        # be gone by the time it is ranked.
+        entry = self.entries.get(key)
+        return entry[1] if entry is not None else -1
+
+    def _ranked_prefixes(self, key):
+        return [ key[:length] for length in range(1, len(key) + 1) if key[:length] in self.top ]
+
+    def add(self, text, weight):
+        key = normalize_query(text)
+        if not key:
+            return
+        current = self.entries.get(key)
+        self.entries[key] = (text, weight)
+        if current is None:
+            bisect.insort(self.keys, key)
+        for prefix in self._ranked_prefixes(key):
+            keys = [ other for other in self.top[prefix] if other != key ] + [key]
+            self.top[prefix] = heapq.nlargest(self.limit, keys, key=self._weight)
+
+    def remove(self, text):
+        key = normalize_query(text)
+        if key not in self.entries:
+            return
+        index = bisect.bisect_left(self.keys, key)
+        del self.keys[index]
+        for prefix in self._ranked_prefixes(key):
+            if key in self.top[prefix]:
+                # Ranked again on the next lookup.
+                del self.top[prefix]
+        del self.entries[key]
+
+    def complete(self, prefix, limit=None):
+        limit = min(limit or self.limit, self.limit)
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+
+        keys = self.top.get(prefix)
+        if keys is None:
+            start = bisect.bisect_left(self.keys, prefix)
+            end = bisect.bisect_left(self.keys, prefix + '\uffff', start)
+            keys = heapq.nlargest(self.limit, self.keys[start:end], key=self._weight)
+            if len(prefix) <= SHORT_PREFIX_LENGTH or end - start > SCAN_LIMIT:
+                self.top[prefix] = keys
+        entries = [ self.entries.get(key) for key in keys ]
+        return [ entry[0] for entry in entries if entry is not None ][:limit]
+
+def _video_entries(videos):
+    return videos.order_by('-views').values_list('title', 'views')
+
+def _channel_entries(channels):
+    channels = channels.filter(user__banned=False).annotate(sub_count=Count('subscriptions'))
+    return channels.order_by('-sub_count').values_list('name', 'sub_count')
+
+def record_changes(texts):
+    texts = set(texts)
+    if not texts:
+        return
+
+    def record():
+        now = time.time()
+        redis = django_rq.get_connection()
+        pipe = redis.pipeline()
+        pipe.zadd(CHANGES_KEY, { text : now for text in texts })
+        pipe.zremrangebyscore(CHANGES_KEY, '-inf', now - settings.SUGGESTION_REBUILD_INTERVAL - CHANGES_LOOKBACK)
+        pipe.execute()
+    # Refreshes have to see the change once they read the set.
+    transaction.on_commit(record)
+
+def get_changes(since):
+    redis = django_rq.get_connection()
+    return { text.decode('utf-8') for text in redis.zrangebyscore(CHANGES_KEY, since - CHANGES_LOOKBACK, '+inf') }
+
+class SuggestionIndex:
+    """
+    Per-process completion index of popular video titles and channel names.
+    Lookups never touch the database: the index is refreshed in a background
+    thread, applying the listing changes recorded since the last refresh
+    between full rebuilds.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.built = self.refreshed = 0
+        self.refreshed_at = None
+        self.lock = threading.Lock()
+
+    def rebuild(self):
+        size = settings.SUGGESTION_INDEX_SIZE
+        refreshed_at = time.time()
+        entries = list(_video_entries(Video.listed_objects.all())[:size]) + list(_channel_entries(Channel.objects.all())[:size])
+        self.index = PrefixIndex(entries)
+        self.built = self.refreshed = time.monotonic()
+        self.refreshed_at = refreshed_at
+
+    def refresh(self):
+        refreshed_at = time.time()
+        texts = get_changes(self.refreshed_at)
+        if texts:
+            # A text stays suggested as long as a listed video or an active
+            # channel still uses it.
+            weights = dict(Video.listed_objects.filter(title__in=texts).values('title').annotate(weight=Max('views')).values_list('title', 'weight'))
+            for name, sub_count in _channel_entries(Channel.objects.filter(name__in=texts)):
+                weights[name] = max(weights.get(name, 0), sub_count)
+            for text in texts:
+                if text in weights:
+                    self.index.add(text, weights[text])
+                else:
+                    self.index.remove(text)
+        self.refreshed = time.monotonic()
+        self.refreshed_at = refreshed_at
+
+    def _update(self):
+        try:
+            if time.monotonic() - self.built > settings.SUGGESTION_REBUILD_INTERVAL:
+                self.rebuild()
+            else:
+                self.refresh()
+        finally:
+            connection.close()
+            self.lock.release()
+
+    def complete(self, prefix, limit=None):
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.rebuild()
+        elif time.monotonic() - self.refreshed > settings.SUGGESTION_REFRESH_INTERVAL and self.lock.acquire(blocking=False):
+            threading.Thread(target=self._update, daemon=True).start()
+        return self.index.complete(prefix, limit)
+
+suggestion_index = SuggestionIndex()
+
+def get_suggestions(prefix, limit=None):
+    return suggestion_index.complete(prefix, limit)
@@ -1,23 +1,23 @@
 from time import sleep
-from . import ffmpeg
+from . import events, ffmpeg
 
 from django.conf import settings
 
-def video_transcode_task(video=None):
-	print('TRANSCODING VIDEO...')
+def set_transcode_status(video, status):
 	video.refresh_from_db()
-	video.transcode_status = video.TranscodeStatus.PROCESSING
+	video.transcode_status = status
 	video.save(update_fields=['transcode_status'])
+	events.publish(video.channel.user_id, 'video.status', watch_id=video.watch_id, status=status)
+
+def video_transcode_task(video=None):
+	print('TRANSCODING VIDEO...')
+	set_transcode_status(video, video.TranscodeStatus.PROCESSING)
 	try:
 		ffmpeg.start_transcoding(video)
-		video.refresh_from_db()
-		video.transcode_status = video.TranscodeStatus.DONE
-		video.save(update_fields=['transcode_status'])
+		set_transcode_status(video, video.TranscodeStatus.DONE)
 		print('TRANSCODING DONE!')
 	except Exception as e:
-		video.refresh_from_db()
-		video.transcode_status = video.TranscodeStatus.ERROR
-		video.save(update_fields=['transcode_status'])
+		set_transcode_status(video, video.TranscodeStatus.ERROR)
 		print(e)
 		print('TRANSCODING FAILED!')
 		raise e
@@ -30,3 +30,31 @@ def video_transcode_task(video=None):
 		except Exception as e:
 			print(e)
 			print('UPLOADING FAILED!')
+
+def refresh_recommendation_pool_task():
+	from .recommendations import build_recommendation_pool
+	build_recommendation_pool()
+
+def build_related_videos_task(k=20):
+	from .recommendations import build_related_videos
+	build_related_videos(k=k)
+
+def flush_watch_history_task():
+	from .models import WatchHistory
+	WatchHistory.objects.flush_buffer()
+
+def flush_session_activity_task():
+	from .sessions import flush_activity
+	flush_activity()
+
+def dispatch_outbox_task():
+	from .outbox import dispatch
+	dispatch()
+
+def schedule_outbox_dispatch_task():
+	from .outbox import schedule_dispatch
+	schedule_dispatch()
+
+def refresh_channel_stats_task():
+	from .models import ChannelStats
+	ChannelStats.objects.refresh_dirty()
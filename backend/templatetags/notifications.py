@@ -3,6 +3,7 @@
 from distutils.version import StrictVersion  # pylint: disable=no-name-in-module,import-error
 
 from django import get_version
+from django.conf import settings
 from django.template import Library
 from django.utils.html import format_html
 
@@ -18,7 +19,7 @@ def notifications_unread(context):
     user = user_context(context)
     if not user:
         return ''
-    return user.notifications.unread().filter(recipient=user).count()
+    return user.unread_notification_count
 
 
 if StrictVersion(get_version()) >= StrictVersion('2.0'):
@@ -30,7 +31,7 @@ else:
 @register.filter
 def has_notification(user):
     if user:
-        return user.notifications.unread().filter(recipient=user).exists()
+        return user.unread_notification_count > 0
     return False
 
 
@@ -47,8 +48,7 @@ def register_notify_callbacks(badge_class='nav__notifications__badge',  # pylint
     if api_name == 'list':
         api_url = reverse('api_notifications_unread')
     elif api_name == 'count':
-        pass
-        # api_url = reverse('api_notifications_count')
+        api_url = reverse('api_notifications_count')
     else:
         return ""
     definitions = """
@@ -57,6 +57,8 @@ def register_notify_callbacks(badge_class='nav__notifications__badge',  # pylint
         notify_api_url='{api_url}';
         notify_fetch_count='{fetch_count}';
         notify_unread_url='{unread_url}';
+        notify_count_url='{count_url}';
+        notify_events_url='{events_url}';
         notify_mark_all_unread_url='{mark_all_unread_url}';
         notify_refresh_period={refresh};
     """.format(
@@ -65,6 +67,8 @@ def register_notify_callbacks(badge_class='nav__notifications__badge',  # pylint
         refresh=refresh_period,
         api_url=api_url,
         unread_url=reverse('api_notifications_unread'),
+        count_url=reverse('api_notifications_count'),
+        events_url=settings.EVENTS_URL,
         mark_all_unread_url=reverse('api_notifications_unread'),
         fetch_count=fetch
     )
@@ -83,7 +87,7 @@ def live_notify_badge(context, badge_class='nav__notifications__badge'):
         return ''
 
     html = "<span class='{badge_class}'>{unread}</span>".format(
-        badge_class=badge_class, unread=user.notifications.unread().filter(recipient=user).count()
+        badge_class=badge_class, unread=user.unread_notification_count
     )
     return format_html(html)
 
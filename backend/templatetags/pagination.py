@@ -0,0 +1,9 @@
+from django.template import Library
+
+register = Library()
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    query = context['request'].GET.copy()
+    query['cursor'] = cursor
+    return '?' + query.urlencode()
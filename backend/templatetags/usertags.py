@@ -1,12 +1,11 @@
-import re
-
 from django.template import Library
 from django.utils.html import format_html
 
+from backend.mentions import MENTION_PATTERN
+
 
 register = Library()
 
 @register.filter
 def usertags(text):
-    pattern = re.compile('\@\((.+)\)\[(.*)\]')
-    return re.sub(pattern, '@\\1', text)
\ No newline at end of file
+    return MENTION_PATTERN.sub('@\\1', text)
\ No newline at end of file
@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tracle.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up.
+from web import sse
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == settings.EVENTS_URL:
+        await sse.application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
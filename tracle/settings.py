@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django.contrib.admin',
     'django.contrib.humanize',
+    'django.contrib.postgres',
 
     'backend.apps.BackendConfig',
     'web.apps.WebConfig',
@@ -67,7 +68,7 @@ MIDDLEWARE = [
     'waffle.middleware.WaffleMiddleware',
 ]
 
-SESSION_ENGINE = 'qsessions.backends.db'
+SESSION_ENGINE = 'backend.sessions'
 
 if DEBUG and 'debug_toolbar' in INSTALLED_APPS:
     MIDDLEWARE.insert(0, 'debug_toolbar.middleware.DebugToolbarMiddleware')
@@ -253,6 +254,26 @@ REST_FRAMEWORK = {
     # ]
 }
 
+RECOMMENDATION_POOL_SIZE = int(os.environ.get('RECOMMENDATION_POOL_SIZE', 10000))
+RECOMMENDATION_POOL_TIMEOUT = int(os.environ.get('RECOMMENDATION_POOL_TIMEOUT', 60*15))
+WATCH_HISTORY_MAX_ENTRIES = int(os.environ.get('WATCH_HISTORY_MAX_ENTRIES', 1000))
+SELECTED_CHANNEL_CACHE_TIMEOUT = int(os.environ.get('SELECTED_CHANNEL_CACHE_TIMEOUT', 60*60))
+CHANNEL_STATS_CACHE_TIMEOUT = int(os.environ.get('CHANNEL_STATS_CACHE_TIMEOUT', 60*60))
+THUMBNAIL_CACHE_TIMEOUT = int(os.environ.get('THUMBNAIL_CACHE_TIMEOUT', 60*60*24))
+# Dotted path to a backend.search backend class, picked from the database
+# engine when unset.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND')
+SEARCH_RESULTS_LIMIT = int(os.environ.get('SEARCH_RESULTS_LIMIT', 1000))
+SEARCH_CACHE_TIMEOUT = int(os.environ.get('SEARCH_CACHE_TIMEOUT', 60*5))
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 90))
+NOTIFICATION_FANOUT_BATCH_SIZE = int(os.environ.get('NOTIFICATION_FANOUT_BATCH_SIZE', 2000))
+NOTIFICATION_AGGREGATION_WINDOW = int(os.environ.get('NOTIFICATION_AGGREGATION_WINDOW', 6 * 60 * 60))
+SUGGESTION_INDEX_SIZE = int(os.environ.get('SUGGESTION_INDEX_SIZE', 50000))
+SUGGESTION_REFRESH_INTERVAL = int(os.environ.get('SUGGESTION_REFRESH_INTERVAL', 60))
+SUGGESTION_REBUILD_INTERVAL = int(os.environ.get('SUGGESTION_REBUILD_INTERVAL', 60*60))
+# Served by tracle.asgi, clients fall back to polling when it is missing.
+EVENTS_URL = os.environ.get('EVENTS_URL', '/events')
+
 CACHEOPS_REDIS = {
     'host': 'localhost',
     'port': 6379,
@@ -7,7 +7,5 @@ from backend.queries import get_channel
 class SelectedChannelMiddleware(MiddlewareMixin):
 
 	def process_request(self, request):
-		if request.user.is_authenticated:
-			channel = get_channel(request.user)
-			request.channel = channel
-			
+		# Resolved on first use, most API calls never look at it.
+		request.channel = SimpleLazyObject(lambda: get_channel(request.user) if request.user.is_authenticated else None)
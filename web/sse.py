@@ -0,0 +1,130 @@
+import asyncio, json, threading, time
+from collections import defaultdict
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+
+import django_rq
+import redis
+
+from backend import events
+
+KEEPALIVE_INTERVAL = 15
+RECONNECT_DELAY = 1
+RETRY_MILLISECONDS = 3000
+QUEUE_SIZE = 100
+
+class EventBroker:
+    """
+    Shares a single Redis subscription between all the streams of a process
+    and hands every event to the queues of the user it was published for.
+    """
+
+    def __init__(self):
+        self.queues = defaultdict(set)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self.lock:
+            self.queues[user_id].add((asyncio.get_event_loop(), queue))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._listen, daemon=True)
+                self.thread.start()
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self.lock:
+            self.queues[user_id] = { entry for entry in self.queues[user_id] if entry[1] is not queue }
+            if not self.queues[user_id]:
+                del self.queues[user_id]
+
+    def _put(self, queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A client that stopped reading misses events, it refetches
+            # everything once it reconnects.
+            pass
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = django_rq.get_connection().pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(events.user_channel('*'))
+                for message in pubsub.listen():
+                    user_id = int(message['channel'].decode('utf-8')[len(events.CHANNEL_PREFIX):])
+                    with self.lock:
+                        targets = list(self.queues.get(user_id, ()))
+                    for loop, queue in targets:
+                        loop.call_soon_threadsafe(self._put, queue, message['data'])
+            except redis.ConnectionError:
+                time.sleep(RECONNECT_DELAY)
+
+broker = EventBroker()
+
+@sync_to_async
+def get_user_id(scope):
+    headers = dict(scope['headers'])
+    session_key = parse_cookie(headers.get(b'cookie', b'').decode('latin-1')).get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return None
+    request = HttpRequest()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    try:
+        user = get_user(request)
+    finally:
+        close_old_connections()
+    if user.is_authenticated and not user.banned:
+        return user.pk
+    return None
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+def format_event(message):
+    message = json.loads(message)
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+async def application(scope, receive, send):
+    """
+    Streams the events of the logged in user as server-sent events.
+    """
+    user_id = await get_user_id(scope)
+    if user_id is None:
+        await send({'type' : 'http.response.start', 'status' : 403, 'headers' : [(b'content-type', b'text/plain')]})
+        await send({'type' : 'http.response.body', 'body' : b'Forbidden'})
+        return
+
+    queue = broker.subscribe(user_id)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({
+            'type' : 'http.response.start',
+            'status' : 200,
+            'headers' : [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')],
+        })
+        await send({'type' : 'http.response.body', 'body' : f'retry: {RETRY_MILLISECONDS}\n\n'.encode('utf-8'), 'more_body' : True})
+        while True:
+            message = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({message, disconnect}, timeout=KEEPALIVE_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                message.cancel()
+                break
+            if message in done:
+                body = format_event(message.result())
+            else:
+                message.cancel()
+                body = ': keepalive\n\n'
+            await send({'type' : 'http.response.body', 'body' : body.encode('utf-8'), 'more_body' : True})
+    finally:
+        disconnect.cancel()
+        broker.unsubscribe(user_id, queue)
@@ -44,6 +44,21 @@ onCloseSearch = () => {
 
 }
 
+let searchSuggestTimeout = null;
+
+onSearchInput = (input) => {
+	clearTimeout(searchSuggestTimeout);
+	searchSuggestTimeout = setTimeout(() => {
+		$.get('/api/search/suggest', {'q' : input.value}, function (result) {
+			const list = $('#search-suggestions');
+			list.empty();
+			result['suggestions'].forEach((suggestion) => {
+				list.append($('<option>').attr('value', suggestion));
+			});
+		});
+	}, 150);
+}
+
 navMenuDesktopToggle = () => {
 	const toggle = document.getElementById("navdesktopmenu-toggle");
 	const menu = document.getElementById("navdesktop-menu");
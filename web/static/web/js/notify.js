@@ -3,6 +3,11 @@ var notify_menu_class;
 var notify_api_url;
 var notify_fetch_count;
 var notify_unread_url;
+var notify_count_url;
+var notify_events_url;
+var notify_events = null;
+var notify_last_count = null;
+var notify_last_updated = null;
 var notify_mark_all_unread_url;
 var notify_refresh_period = 15000;
 var consecutive_misfires = 0;
@@ -54,16 +59,23 @@ function markReadAndOpen(event, id) {
     });
 }
 
+function actors_text(item) {
+    if (item.actor_count > 1) {
+        return item.actor.name + ' and ' + (item.actor_count - 1) + (item.actor_count > 2 ? ' others' : ' other');
+    }
+    return item.actor.name;
+}
+
 function comment_template(item) {
     message = '';
     message += '<a class="item" href="/watch?v=' + item.target_object.watch_id  + '#comment-' + item.action_object.id + '" onclick="markReadAndOpen(event, ' + item.id + ')"' + '>';
     message +=   '<img class="avatar" src="' + item.actor.avatar + '">';
     message +=   '<div class="action">';
     message +=     '<div class="action__text">';
-    message +=       '' + item.actor.name + ' commented:<div style="white-space: nowrap;text-overflow: ellipsis;">' + item.action_object.text + '</div>';
+    message +=       '' + actors_text(item) + ' commented:<div style="white-space: nowrap;text-overflow: ellipsis;">' + item.action_object.text + '</div>';
     message +=     '</div>';
     message +=     '<div class="action__timestamp">';
-    message +=       '' + item.created + ' ago';
+    message +=       '' + item.updated + ' ago';
     message +=     '</div>';
     message +=   '</div>';
     message +=   '' + '<img class="target" src="' + item.target_object.thumbnail + '">'
@@ -80,7 +92,7 @@ function video_template(item) {
     message +=       '' + item.actor.name + ' uploaded: ' + item.action_object.title;
     message +=     '</div>';
     message +=     '<div class="action__timestamp">';
-    message +=       '' + item.created + ' ago';
+    message +=       '' + item.updated + ' ago';
     message +=     '</div>';
     message +=   '</div>';
     message +=   '<img class="target" src="' + item.action_object.thumbnail + '">';
@@ -94,10 +106,10 @@ function tag_template(item) {
     message +=   '<img class="avatar" src="' + item.actor.avatar + '">';
     message +=   '<div class="action">';
     message +=     '<div class="action__text">';
-    message +=       '' + item.actor.name + ' tagged you';
+    message +=       '' + actors_text(item) + ' tagged you';
     message +=     '</div>';
     message +=     '<div class="action__timestamp">';
-    message +=       '' + item.created + ' ago'; 
+    message +=       '' + item.updated + ' ago'; 
     message +=     '</div>';
     message +=   '</div>';
     message +=   '</div><img class="target" src="' + item.target_object.thumbnail + '">';
@@ -109,22 +121,44 @@ function register_notifier(func) {
     registered_functions.push(func);
 }
 
+function fetch_list_data() {
+    var r = new XMLHttpRequest();
+    r.addEventListener('readystatechange', function(event){
+        if (this.readyState === 4){
+            if (this.status === 200){
+                consecutive_misfires = 0;
+                var data = JSON.parse(r.responseText);
+                registered_functions.forEach(function (func) { func(data); });
+            }else{
+                consecutive_misfires++;
+            }
+        }
+    })
+    r.open("GET", notify_api_url+'?status=unread', true);
+    r.send();
+}
+
 function fetch_api_data() {
     if (registered_functions.length > 0) {
-        //only fetch data if a function is setup
+        //only fetch data if a function is setup, the list is only
+        //reloaded when the unread count has changed
         var r = new XMLHttpRequest();
         r.addEventListener('readystatechange', function(event){
             if (this.readyState === 4){
                 if (this.status === 200){
                     consecutive_misfires = 0;
                     var data = JSON.parse(r.responseText);
-                    registered_functions.forEach(function (func) { func(data); });
+                    if (data.unread_count !== notify_last_count || data.updated !== notify_last_updated) {
+                        notify_last_count = data.unread_count;
+                        notify_last_updated = data.updated;
+                        fetch_list_data();
+                    }
                 }else{
                     consecutive_misfires++;
                 }
             }
         })
-        r.open("GET", notify_api_url+'?status=unread', true);
+        r.open("GET", notify_count_url, true);
         r.send();
     }
     if (consecutive_misfires < 10) {
@@ -140,4 +174,26 @@ function fetch_api_data() {
     }
 }
 
-setTimeout(fetch_api_data, 1000);
\ No newline at end of file
+function start_notifications() {
+    if (!window.EventSource || !notify_events_url) {
+        setTimeout(fetch_api_data, 1000);
+        return;
+    }
+    notify_events = new EventSource(notify_events_url);
+    notify_events.addEventListener('open', function () {
+        //events sent while disconnected are lost, resync on every connect
+        fetch_list_data();
+    });
+    notify_events.addEventListener('notifications', function () {
+        fetch_list_data();
+    });
+    notify_events.addEventListener('error', function () {
+        if (notify_events.readyState === EventSource.CLOSED) {
+            //the push endpoint is not served, poll instead
+            notify_events = null;
+            setTimeout(fetch_api_data, 1000);
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', start_notifications);
\ No newline at end of file
@@ -11,11 +11,11 @@ from django.conf import settings
 from django.utils.encoding import force_bytes, force_text
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.template.loader import render_to_string
-from django.core.paginator import Paginator
 from django.http import JsonResponse
 
 from backend.forms import SignupForm, SigninForm, ResetPasswordForm, SetPasswordForm, ChangeUserForm, VideoDetailsForm, ChannelBackgroundForm
 from backend import queries
+from backend.pagination import KeysetPaginator, IdListPaginator
 from backend.models import WatchHistory
 from .tokens import account_activation_token
 
@@ -46,11 +46,8 @@ class HomeView(View):
                 videos = queries.get_videos_from_category(category)
                 context['selected_category'] = category
 
-        context['videos'] = videos
-
-        page_number = request.GET.get('p', 1)
-        paginator = Paginator(context['videos'], 20)
-        context['videos'] = paginator.get_page(page_number)
+        paginator = KeysetPaginator(videos, 20)
+        context['videos'] = paginator.get_page(request.GET.get('cursor'))
 
         context['recommended_videos'] = recommended_videos = queries.get_recommended_videos()
 
@@ -60,7 +57,8 @@ class ResultsView(View):
     def get(self, request):
         categories = queries.get_all_categories()
         search_terms = request.GET.get('search_terms', '')
-        videos = queries.filter_by_search_terms(search_terms)
+        paginator = IdListPaginator(queries.get_search_results(search_terms), 20, queries.get_public_videos())
+        videos = paginator.get_page(request.GET.get('cursor'))
         return render(request, 'web/results.html', {'search_terms' : search_terms, 'categories' : categories, 'videos' : videos})
 
 class TermsView(View):
@@ -122,8 +120,7 @@ class SigninView(View):
             if user is not None:
                 login(request, user)
                 user.update_last_login(request.META.get('REMOTE_ADDR'))
-                channel = queries.get_channel(user)
-                channel.update_last_login()
+                request.channel.update_last_login()
                 return redirect(request.GET.get('redirect_to', 'web_home'))
         return render(request, 'web/signin.html', {'form' : form})
 
@@ -147,24 +144,25 @@ class ResetPasswordConfirmView(PasswordResetConfirmView):
 
 class WatchView(View):
     def get(self, request):
-        recommended_videos = queries.get_recommended_videos()
         watch_id = request.GET.get('v', None)
         video = queries.get_published_video_or_none(watch_id)
         
         if not video:
-            return render(request, 'web/watch.html', {'recommended_videos' : recommended_videos})
+            return render(request, 'web/watch.html', {'recommended_videos' : queries.get_recommended_videos()})
         if video.visibility == video.VisibilityStatus.PRIVATE:
             if request.user.is_authenticated:
                 if not request.channel == video.channel:
-                    return render(request, 'web/watch.html', {'recommended_videos' : recommended_videos})
+                    return render(request, 'web/watch.html', {'recommended_videos' : queries.get_recommended_videos()})
             else:
-                return render(request, 'web/watch.html', {'recommended_videos' : recommended_videos})
+                return render(request, 'web/watch.html', {'recommended_videos' : queries.get_recommended_videos()})
+
+        recommended_videos = queries.get_related_videos(video) or queries.get_recommended_videos()
 
         is_liked = False
         is_disliked = False
         subscribed = False
         if request.user.is_authenticated:
-            channel = queries.get_channel(request.user)
+            channel = request.channel
             is_liked = queries.is_video_liked(video, channel)
             is_disliked = queries.is_video_disliked(video, channel)
             subscribed = queries.is_subscribed(video.channel, channel)
@@ -198,12 +196,12 @@ class DashboardBaseView(LoginRequiredMixin, View):
 class DashboardSettingsView(DashboardBaseView):
 
     def get(self, request):
-        channel = queries.get_channel(request.user)
+        channel = request.channel
         form = ChangeUserForm({'email' : request.user.email, 'channel_name' : channel.name, 'description' : channel.description})
         return render(request, 'web/dashboard_account.html', {'form' : form, 'channel' : channel})
 
     def post(self, request):
-        channel = queries.get_channel(request.user)
+        channel = request.channel
         form = ChangeUserForm({'email' : request.user.email, 'channel_name' : request.POST.get('channel_name'), 'description' : request.POST.get('description')})
         context = {'form' : form, 'channel' : channel}
         if form.is_valid():
@@ -230,11 +228,11 @@ class ChannelVideosView(View):
         channel = queries.get_channel_by_id(channel_id)
         if not channel:
             return render(request, 'web/channel_videos.html', {})
-        total_views = queries.get_total_views(channel)
+        stats = queries.get_channel_stats(channel)
         subscribed = False
         if request.user.is_authenticated:
-            subscribed = queries.is_subscribed(channel, queries.get_channel(request.user))
-        videos = queries.get_videos_from_channel(channel)
+            subscribed = queries.is_subscribed(channel, request.channel)
+        videos = queries.get_videos_from_channel(channel).select_related('image_set__primary_image')
         ordering = request.GET.get('sort', 'da')
         if ordering == 'da':
             videos  = videos.order_by('-created')
@@ -242,8 +240,10 @@ class ChannelVideosView(View):
             videos  = videos.order_by('created')
         elif ordering == 'p':
             videos  =  videos.order_by('-views')
+        paginator = KeysetPaginator(videos, 20)
+        videos = paginator.get_page(request.GET.get('cursor'))
 
-        return render(request, 'web/channel_videos.html', {'channel' : channel, 'is_subscribed' : subscribed, 'total_views' : total_views, 'videos' : videos, 'selected_tab' : 'videos', 'ordering' : ordering})
+        return render(request, 'web/channel_videos.html', {'channel' : channel, 'is_subscribed' : subscribed, 'stats' : stats, 'videos' : videos, 'selected_tab' : 'videos', 'ordering' : ordering})
 
 class ChannelFeaturedView(View):
 
@@ -252,16 +252,12 @@ class ChannelFeaturedView(View):
         channel = queries.get_channel_by_id(channel_id)
         if not channel:
             return render(request, 'web/channel_featured.html', {})
-        total_views = queries.get_total_views(channel)
+        stats = queries.get_channel_stats(channel)
         subscribed = False
         if request.user.is_authenticated:
-            subscribed = queries.is_subscribed(channel, queries.get_channel(request.user))
-        qs = queries.get_videos_from_channel(channel)
-        if qs:
-            featured_video = qs.order_by('-views')[0]
-        else:
-            featured_video = None
-        return render(request, 'web/channel_featured.html', {'channel' : channel, 'is_subscribed' : subscribed, 'total_views' : total_views, 'selected_tab' : 'featured', 'featured_video' : featured_video})
+            subscribed = queries.is_subscribed(channel, request.channel)
+        featured_video = queries.get_featured_video(stats)
+        return render(request, 'web/channel_featured.html', {'channel' : channel, 'is_subscribed' : subscribed, 'stats' : stats, 'selected_tab' : 'featured', 'featured_video' : featured_video})
 
 class ChannelFeedView(View):
 
@@ -271,23 +267,18 @@ class ChannelFeedView(View):
         filter = request.GET.get('filter', '2')
         if not channel:
             return render(request, 'web/channel_feed.html', {})
-        total_views = queries.get_total_views(channel)
+        stats = queries.get_channel_stats(channel)
         subscribed = False
         if request.user.is_authenticated:
-            subscribed = queries.is_subscribed(channel, queries.get_channel(request.user))
+            subscribed = queries.is_subscribed(channel, request.channel)
 
         if filter  == '1':
-            all_qs = [ video.target_actions.public() for video in channel.videos.all() ]
-            if all_qs:
-                stream = all_qs[0].union(*all_qs)
-                stream = stream.order_by('-timestamp')
-            else:
-                stream = []
+            stream = queries.get_channel_comment_activity(channel)
         else:
-            from actstream.models import actor_stream
-            stream = actor_stream(channel)
-            stream = stream.exclude(verb='commented')
-        return render(request, 'web/channel_feed.html', {'channel' : channel, 'is_subscribed' : subscribed, 'total_views' : total_views, 'selected_tab' : 'feed', 'filter' : filter, 'stream' : stream})
+            stream = queries.get_channel_activity(channel)
+        paginator = KeysetPaginator(stream, 20)
+        stream = paginator.get_page(request.GET.get('cursor'))
+        return render(request, 'web/channel_feed.html', {'channel' : channel, 'is_subscribed' : subscribed, 'stats' : stats, 'selected_tab' : 'feed', 'filter' : filter, 'stream' : stream})
 
 class ChannelEditorView(LoginRequiredMixin, View):
     login_url = '/signin'
@@ -346,10 +337,8 @@ class WatchHistoryView(LoginRequiredMixin, View):
 
     def get(self, request):
         categories = queries.get_all_categories()
-        history = request.channel.watch_history.order_by('-created')
-        all_videos = [ entry.video for entry in history ]
-        page_number = request.GET.get('p', 1)
-        paginator = Paginator(all_videos, 20)
-        videos = paginator.get_page(page_number)
+        history = request.channel.watch_history.select_related('video__channel', 'video__image_set__primary_image').order_by('-created')
+        paginator = KeysetPaginator(history, 20)
+        history = paginator.get_page(request.GET.get('cursor'))
 
-        return render(request, 'web/watch_history.html', {'videos' : videos, 'categories' : categories})
\ No newline at end of file
+        return render(request, 'web/watch_history.html', {'history' : history, 'categories' : categories})
\ No newline at end of file